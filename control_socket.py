@@ -0,0 +1,235 @@
+"""
+Local control socket for tiling-rightclick and super-activity-view.
+
+Each daemon listens on a Unix stream socket in /run. A client sends one
+JSON request per line, {"cmd": "status"}, and gets one JSON reply per
+line: {"ok": true, ...} or {"ok": false, "error": "..."}. Commands:
+
+    status    pid, uptime, paused, number of devices
+    devices   the devices being read (and grabbed)
+    stats     event and gesture counters
+    config    the configuration in effect
+    reload    re-read config.json
+    pause     release the devices (tiling-rightclick) / stop injecting
+    resume    undo pause
+
+Anyone may ask; reload, pause and resume need root or membership in one of
+ADMIN_GROUPS (the users polkit would let run systemctl). ControlServer runs
+inside the daemon's own loop: it only needs add_reader/remove_reader, which
+both InputHub and asyncio provide, and never blocks on a client.
+"""
+
+import grp
+import json
+import os
+import pwd
+import socket
+import struct
+import time
+
+PROXY_SOCKET = "/run/tiling-rightclick/control.sock"
+SUPER_SOCKET = "/run/super-activity-view/control.sock"
+
+PRIVILEGED = frozenset(("reload", "pause", "resume"))
+ADMIN_GROUPS = ("sudo", "wheel", "admin")
+
+# Requests are a few bytes; anything longer is not a client of ours
+MAX_REQUEST = 4096
+MAX_CLIENTS = 16
+
+# Replies come straight from the daemon's loop, so this is generous
+CLIENT_TIMEOUT = 0.5
+
+# struct ucred: pid, uid, gid
+UCRED = struct.Struct("3i")
+
+
+class ControlError(Exception):
+    """A request the daemon refused, or a reply that made no sense."""
+
+
+def is_admin(uid):
+    """Whether uid may use the privileged commands."""
+    if uid == 0:
+        return True
+    try:
+        user = pwd.getpwuid(uid)
+        groups = os.getgrouplist(user.pw_name, user.pw_gid)
+    except (KeyError, OSError):
+        return False
+    for name in ADMIN_GROUPS:
+        try:
+            if grp.getgrnam(name).gr_gid in groups:
+                return True
+        except KeyError:
+            pass
+    return False
+
+
+class ControlServer:
+    """Answers control requests from the daemon's event loop."""
+
+    def __init__(self, path, commands, log):
+        # commands: name -> callable(request dict) returning a dict for the reply
+        self.path = path
+        self.commands = commands
+        self.log = log
+        self.sock = None
+        self.clients = {}  # socket -> bytes received so far
+        self.started = time.monotonic()
+        self.add_reader = None
+        self.remove_reader = None
+
+    def start(self, add_reader, remove_reader):
+        """Listen on path; add_reader(fileobj, callback) hooks into the loop."""
+        if self.in_use():
+            self.log.warning("Control socket %s belongs to another instance; not serving it", self.path)
+            return False
+        os.makedirs(os.path.dirname(self.path), mode=0o755, exist_ok=True)
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.bind(self.path)
+            # Everyone may connect; privileged commands check the peer
+            os.chmod(self.path, 0o666)
+            sock.listen(MAX_CLIENTS)
+        except OSError:
+            sock.close()
+            raise
+        sock.setblocking(False)
+        self.sock = sock
+        self.add_reader = add_reader
+        self.remove_reader = remove_reader
+        add_reader(sock, self.on_connect)
+        self.log.info("Control socket: %s", self.path)
+        return True
+
+    def in_use(self):
+        """Whether a live daemon already answers on path."""
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+            return True
+        except OSError:
+            return False
+        finally:
+            probe.close()
+
+    def uptime(self):
+        return round(time.monotonic() - self.started, 1)
+
+    def on_connect(self):
+        try:
+            conn, _ = self.sock.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        if len(self.clients) >= MAX_CLIENTS:
+            conn.close()
+            return
+        conn.setblocking(False)
+        self.clients[conn] = b""
+        self.add_reader(conn, lambda: self.on_client(conn))
+
+    def on_client(self, conn):
+        try:
+            data = conn.recv(MAX_REQUEST)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.drop(conn)
+            return
+
+        pending = self.clients[conn] + data
+        while b"\n" in pending:
+            line, pending = pending.split(b"\n", 1)
+            reply = json.dumps(self.dispatch(conn, line)).encode() + b"\n"
+            try:
+                # Replies fit the socket buffer many times over; a client that
+                # does not read them is dropped rather than waited for
+                sent = conn.send(reply)
+            except OSError:
+                sent = 0
+            if sent != len(reply):
+                self.drop(conn)
+                return
+        if len(pending) > MAX_REQUEST:
+            self.drop(conn)
+            return
+        self.clients[conn] = pending
+
+    def dispatch(self, conn, line):
+        try:
+            request = json.loads(line)
+            cmd = request["cmd"]
+            handler = self.commands.get(cmd)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return {"ok": False, "error": "malformed request"}
+        if handler is None:
+            return {"ok": False, "error": f"unknown command: {cmd}"}
+        if cmd in PRIVILEGED:
+            pid, uid, gid = UCRED.unpack(conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, UCRED.size))
+            if not is_admin(uid):
+                return {"ok": False, "error": "permission denied"}
+            self.log.info("Control: %s (pid %d, uid %d)", cmd, pid, uid)
+        try:
+            reply = handler(request)
+        except ControlError as err:
+            return {"ok": False, "error": str(err)}
+        except Exception as err:
+            self.log.error("Control: %s failed: %s", cmd, err)
+            return {"ok": False, "error": str(err)}
+        return {"ok": True, **(reply or {})}
+
+    def drop(self, conn):
+        self.clients.pop(conn, None)
+        try:
+            self.remove_reader(conn)
+        except (KeyError, ValueError):
+            pass
+        conn.close()
+
+    def close(self):
+        if not self.sock:
+            return
+        for conn in list(self.clients):
+            self.drop(conn)
+        try:
+            self.remove_reader(self.sock)
+        except (KeyError, ValueError):
+            pass
+        self.sock.close()
+        self.sock = None
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+def request(path, cmd, timeout=CLIENT_TIMEOUT, **args):
+    """Send one request and return the reply.
+
+    Raises OSError if no daemon listens on path (it is not running) and
+    ControlError if it refused the request.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(json.dumps({"cmd": cmd, **args}).encode() + b"\n")
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    try:
+        reply = json.loads(data)
+    except ValueError:
+        raise ControlError("malformed reply")
+    if not isinstance(reply, dict) or not reply.get("ok"):
+        raise ControlError(reply.get("error", "request failed") if isinstance(reply, dict) else "malformed reply")
+    return reply
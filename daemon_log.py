@@ -0,0 +1,151 @@
+"""
+Logging for the daemons that stays off the input hot path.
+
+Log calls only append (level, format, args) to a bounded ring buffer; a
+background thread formats and writes the records, applies per-message
+rate limiting, and reports anything it had to drop. Methods for levels
+below the configured one are bound to a no-op, so disabled debug logging
+costs a single call and never formats anything.
+
+Under systemd (JOURNAL_STREAM set) lines carry a <N> syslog prefix so the
+journal records the right priority.
+"""
+
+import atexit
+import collections
+import os
+import sys
+import threading
+import time
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR}
+_SYSLOG_PRIORITY = {DEBUG: 7, INFO: 6, WARNING: 4, ERROR: 3}
+
+# Drain cadence; log lines may reach the journal this much later
+DRAIN_INTERVAL = 0.1
+
+# At most RATE_BURST lines with the same format per RATE_WINDOW seconds
+RATE_BURST = 20
+RATE_WINDOW = 5.0
+
+
+def _noop(*args):
+    pass
+
+
+class DaemonLog:
+    """Leveled, rate-limited logger drained by a background thread."""
+
+    def __init__(self, level=INFO, capacity=1024, stream=None):
+        self.ring = collections.deque(maxlen=capacity)
+        self.stream = stream
+        self.prefix = bool(os.environ.get("JOURNAL_STREAM"))
+        self.queued = 0
+        self.written = 0
+        self.thread = None
+        self.wakeup = threading.Event()
+        self.stopping = False
+        self.limits = {}  # format -> [window start, count, suppressed]
+        self.set_level(level)
+
+    def set_level(self, level):
+        """Set the threshold from a level number or name ("debug", "info", ...)."""
+        if isinstance(level, str):
+            level = LEVELS.get(level.lower(), INFO)
+        self.level = level
+        for name, value in LEVELS.items():
+            if value >= level:
+                setattr(self, name, self._bind(value))
+            else:
+                setattr(self, name, _noop)
+
+    def _bind(self, level):
+        def log(fmt, *args):
+            self.ring.append((level, fmt, args))
+            self.queued += 1
+            if self.thread is None:
+                self._start()
+        return log
+
+    def _start(self):
+        self.thread = threading.Thread(target=self._run, name="daemon-log", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        while not self.stopping:
+            self.wakeup.wait(DRAIN_INTERVAL)
+            self.wakeup.clear()
+            self.drain()
+        self.drain()
+
+    def drain(self):
+        """Format and write everything queued so far."""
+        ring = self.ring
+        now = time.monotonic()
+        while ring:
+            try:
+                level, fmt, args = ring.popleft()
+            except IndexError:
+                break
+            self.written += 1
+            if self._limited(fmt, now):
+                continue
+            try:
+                text = fmt % args if args else fmt
+            except (TypeError, ValueError) as err:
+                text = f"{fmt!r} {args!r} (bad log format: {err})"
+            self._write(level, text)
+        lost = self.queued - self.written - len(ring)
+        if lost > 0:
+            self.written += lost
+            self._write(WARNING, f"Log ring buffer overflowed, {lost} message(s) lost")
+        self._report_suppressed(now)
+
+    def _limited(self, fmt, now):
+        limit = self.limits.get(fmt)
+        if limit is None or now - limit[0] >= RATE_WINDOW:
+            if limit and limit[2]:
+                self._write(WARNING, f"Suppressed {limit[2]} message(s) like: {fmt}")
+            self.limits[fmt] = [now, 1, 0]
+            return False
+        if limit[1] < RATE_BURST:
+            limit[1] += 1
+            return False
+        limit[2] += 1
+        return True
+
+    def _report_suppressed(self, now, final=False):
+        for fmt, limit in list(self.limits.items()):
+            if final or now - limit[0] >= RATE_WINDOW:
+                if limit[2]:
+                    self._write(WARNING, f"Suppressed {limit[2]} message(s) like: {fmt}")
+                del self.limits[fmt]
+
+    def _write(self, level, text):
+        stream = self.stream or (sys.stderr if level >= WARNING else sys.stdout)
+        if self.prefix:
+            text = f"<{_SYSLOG_PRIORITY[level]}>{text}"
+        try:
+            stream.write(text + "\n")
+            stream.flush()
+        except (OSError, ValueError):
+            pass
+
+    def close(self):
+        """Flush everything and stop the drain thread."""
+        if self.thread is None:
+            return
+        self.stopping = True
+        self.wakeup.set()
+        if self.thread is not threading.current_thread():
+            self.thread.join(timeout=1.0)
+        self.thread = None
+        self.stopping = False
+        self.drain()
+        self._report_suppressed(time.monotonic(), final=True)
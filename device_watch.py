@@ -0,0 +1,78 @@
+"""
+inotify watch on /dev/input for hotplugged evdev nodes.
+
+DeviceWatcher is a selectable object: register it with the daemon's
+selector and call read() when it becomes readable to get the event nodes
+that appeared (or changed attributes, which udev does right after
+creation) since the last call.
+
+The same watch works for other directories: tiling-rightclick watches
+/etc/tiling-rightclick for config.json being rewritten (mask
+IN_CLOSE_WRITE | IN_MOVED_TO, which covers editors that save by rename).
+"""
+
+import ctypes
+import ctypes.util
+import os
+import struct
+
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+
+# struct inotify_event header: wd, mask, cookie, len (name follows)
+_EVENT = struct.Struct("iIII")
+
+_libc = None
+
+
+def _inotify():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    return _libc
+
+
+class DeviceWatcher:
+    """Reports event* nodes created in an input device directory."""
+
+    def __init__(self, directory="/dev/input", prefix="event", mask=IN_CREATE | IN_ATTRIB):
+        self.directory = directory
+        self.prefix = prefix
+        libc = _inotify()
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1: {os.strerror(err)}")
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch {directory}: {os.strerror(err)}")
+
+    def fileno(self):
+        return self.fd
+
+    def read(self):
+        """Return the paths of new or changed event nodes, without duplicates."""
+        paths = []
+        while True:
+            try:
+                data = os.read(self.fd, 4096)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+                offset += length
+                if name.startswith(self.prefix):
+                    path = os.path.join(self.directory, name)
+                    if path not in paths:
+                        paths.append(path)
+        return paths
+
+    def close(self):
+        os.close(self.fd)
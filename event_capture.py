@@ -0,0 +1,100 @@
+"""
+Compact binary capture of raw input events.
+
+Both daemons can record the events they read (--capture FILE) so glitches
+can be reproduced and high-rate traffic replayed later with
+tools/replay_capture.py. The file is a 16-byte header followed by
+fixed-width records mirroring struct input_event plus a device id:
+
+    int64 sec, uint32 usec, uint16 type, uint16 code, int32 value,
+    uint16 device, 2 bytes padding                       (24 bytes)
+
+CaptureReader memory-maps the file and decodes records lazily, so
+multi-minute 8 kHz captures replay without materialising them as objects.
+"""
+
+import mmap
+import struct
+
+MAGIC = b"TRCAPv1\0"
+HEADER = struct.Struct("<8sHH4x")  # magic, record size, reserved
+RECORD = struct.Struct("<qIHHiHxx")
+
+# Records buffered before hitting the file
+BUFFER_RECORDS = 1024
+
+
+class CaptureWriter:
+    """Appends input events to a capture file through a fixed buffer."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, RECORD.size, 0))
+        self.buffer = bytearray(RECORD.size * BUFFER_RECORDS)
+        self.offset = 0
+        self.count = 0
+
+    def write(self, device, sec, usec, etype, code, value):
+        """Record one event."""
+        RECORD.pack_into(self.buffer, self.offset, sec, usec, etype, code, value, device)
+        self.offset += RECORD.size
+        self.count += 1
+        if self.offset == len(self.buffer):
+            self.flush()
+
+    def record(self, device, events):
+        """Record a batch of evdev InputEvents; returns them as a list."""
+        events = list(events)
+        for event in events:
+            self.write(device, event.sec, event.usec, event.type, event.code, event.value)
+        return events
+
+    def flush(self):
+        if self.offset:
+            self.file.write(memoryview(self.buffer)[:self.offset])
+            self.offset = 0
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+class CaptureReader:
+    """Memory-mapped, read-only view of a capture file."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.mmap) < HEADER.size:
+            self.close()
+            raise ValueError(f"{path}: not a capture file (too short)")
+        magic, record_size, _ = HEADER.unpack_from(self.mmap)
+        if magic != MAGIC or record_size != RECORD.size:
+            self.close()
+            raise ValueError(f"{path}: not a capture file or unsupported version")
+        # A capture cut short mid-record (daemon killed) just loses the tail
+        self.count = (len(self.mmap) - HEADER.size) // RECORD.size
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        """Yield (sec, usec, type, code, value, device) tuples lazily."""
+        # unpack_from by offset holds no buffer export between records, so
+        # close() works while an iterator is still alive
+        data = self.mmap
+        unpack_from = RECORD.unpack_from
+        for offset in range(HEADER.size, HEADER.size + self.count * RECORD.size, RECORD.size):
+            yield unpack_from(data, offset)
+
+    def close(self):
+        self.mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,28 @@
+"""
+Monotonic kernel timestamps on evdev file descriptors (EVIOCSCLOCKID).
+
+Every input_event carries the time the kernel queued it. By default that
+is CLOCK_REALTIME, which jumps when the wall clock is set; after
+use_monotonic_clock() the same file descriptor reports CLOCK_MONOTONIC
+instead. Timing gestures from these stamps rather than from when Python
+got around to the event keeps them exact under backlog.
+"""
+
+import errno
+import fcntl
+import struct
+import time
+
+# _IOW('E', 0xa0, int)
+EVIOCSCLOCKID = 0x400445a0
+
+
+def use_monotonic_clock(fd):
+    """Switch fd's event timestamps to CLOCK_MONOTONIC. False if unsupported."""
+    try:
+        fcntl.ioctl(fd, EVIOCSCLOCKID, struct.pack("i", time.CLOCK_MONOTONIC))
+    except OSError as err:
+        if err.errno in (errno.EINVAL, errno.ENOTTY):
+            return False
+        raise
+    return True
@@ -0,0 +1,76 @@
+"""
+Kernel-side event filtering for evdev clients (EVIOCSMASK).
+
+A client that only cares about a few event codes can ask the kernel not
+to queue the rest on its file descriptor. Frames that end up empty are
+dropped as well, so a masked-out mouse motion never wakes the reader.
+Masks are per open file: other readers of the device, and exclusive
+grabs, are unaffected.
+
+EVIOCSMASK needs Linux 4.4; where it is missing, EventFilter does the same
+filtering in userspace right after read().
+"""
+
+import ctypes
+import errno
+import fcntl
+import struct
+
+from input_codes import EV_SYN, EV_KEY, EV_REL, EV_CNT, KEY_CNT, REL_CNT
+
+# _IOW('E', 0x93, struct input_mask)
+EVIOCSMASK = 0x40104593
+
+# struct input_mask: u32 type, u32 codes_size (bytes), u64 codes_ptr
+_INPUT_MASK = struct.Struct("IIQ")
+
+# Code space per event type; type 0 (EV_SYN) selects the mask of event types
+_CODE_COUNTS = {EV_SYN: EV_CNT, EV_KEY: KEY_CNT, EV_REL: REL_CNT}
+
+_WORD_BITS = ctypes.sizeof(ctypes.c_ulong) * 8
+
+
+def _bitmap(codes, count):
+    """Kernel bitmap (array of unsigned long) with the given bits set."""
+    bits = (ctypes.c_ulong * ((count + _WORD_BITS - 1) // _WORD_BITS))()
+    for code in codes:
+        bits[code // _WORD_BITS] |= 1 << (code % _WORD_BITS)
+    return bits
+
+
+def set_event_mask(fd, etype, codes):
+    """Only let these codes of etype (or these event types, for EV_SYN) through."""
+    bits = _bitmap(codes, _CODE_COUNTS[etype])
+    request = _INPUT_MASK.pack(etype, ctypes.sizeof(bits), ctypes.addressof(bits))
+    fcntl.ioctl(fd, EVIOCSMASK, request)
+
+
+def mask_events(fd, keep):
+    """Mask everything on fd except keep ({type: codes, or None for every code}).
+
+    EV_SYN always passes. Returns False if the kernel has no EVIOCSMASK.
+    """
+    try:
+        set_event_mask(fd, EV_SYN, keep)
+        for etype, codes in keep.items():
+            if codes is not None:
+                set_event_mask(fd, etype, codes)
+    except OSError as err:
+        if err.errno in (errno.EINVAL, errno.ENOTTY):
+            return False
+        raise
+    return True
+
+
+class EventFilter:
+    """Userspace fallback for mask_events(): drops events keep does not allow."""
+
+    def __init__(self, keep):
+        self.types = frozenset(keep) | {EV_SYN}
+        self.codes = {etype: frozenset(codes) for etype, codes in keep.items() if codes is not None}
+
+    def __call__(self, events):
+        types = self.types
+        codes = self.codes
+        return [event for event in events
+                if event.type in types and (event.type not in codes or event.code in codes[event.type])]
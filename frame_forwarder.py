@@ -0,0 +1,81 @@
+"""
+Frame-batched event forwarding for the tiling-rightclick proxy.
+
+The kernel delivers input as frames: a run of events terminated by
+SYN_REPORT. Forwarding each event with its own syn() splits one hardware
+frame into many, and costs two write(2) calls per event. FrameForwarder
+collects events per source device and hands whole frames to the output,
+keeping only the SYN_REPORTs the device actually sent. Outputs with a
+write_frame() of their own (RawOutput) get each frame in a single call.
+"""
+
+from input_codes import EV_SYN, SYN_REPORT
+
+
+class FrameForwarder:
+    """Buffers events per source device and forwards them frame by frame."""
+
+    def __init__(self, output):
+        # output only needs write(type, code, value), like evdev.UInput
+        self.output = output
+        self.pending = {}  # source fd -> list of (type, code, value)
+        self.frames = 0
+        self.events = 0
+
+    @property
+    def output(self):
+        return self._output
+
+    @output.setter
+    def output(self, output):
+        # Looked up once per output, not per frame
+        self._output = output
+        self.frame_writer = getattr(output, "write_frame", None)
+
+    def push(self, source, etype, code, value):
+        """Queue one event from source; flushes when the frame is complete."""
+        if etype == EV_SYN and code == SYN_REPORT:
+            self.flush(source)
+            return
+        frame = self.pending.get(source)
+        if frame is None:
+            frame = self.pending[source] = []
+        frame.append((etype, code, value))
+
+    def frame(self, source):
+        """The pending frame of source, for callers that append to it directly.
+
+        Events appended must not include SYN_REPORT; call flush() for that.
+        """
+        frame = self.pending.get(source)
+        if frame is None:
+            frame = self.pending[source] = []
+        return frame
+
+    def flush(self, source):
+        """Forward the pending frame of source followed by one SYN_REPORT.
+
+        Frames that ended up empty (e.g. the only event was a swallowed
+        button) are not forwarded; an empty SYN_REPORT tells nobody anything.
+        """
+        frame = self.pending.get(source)
+        if not frame:
+            return
+        self.write_frame(frame)
+        frame.clear()
+
+    def write_frame(self, events):
+        """Write events and terminate them with a single SYN_REPORT."""
+        if self.frame_writer:
+            self.frame_writer(events)
+        else:
+            write = self._output.write
+            for etype, code, value in events:
+                write(etype, code, value)
+            write(EV_SYN, SYN_REPORT, 0)
+        self.frames += 1
+        self.events += len(events) + 1
+
+    def discard(self, source):
+        """Forget any partial frame from source (device lost)."""
+        self.pending.pop(source, None)
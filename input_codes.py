@@ -0,0 +1,38 @@
+"""
+Linux input event codes used by the tiling-rightclick modules.
+
+Values mirror linux/input-event-codes.h. They are kept here so the
+forwarding and gesture code can be imported (and benchmarked) on machines
+without python-evdev or /dev/uinput.
+"""
+
+# Event types
+EV_SYN = 0x00
+EV_KEY = 0x01
+EV_REL = 0x02
+EV_MSC = 0x04
+EV_CNT = 0x20
+
+# Synchronization events
+SYN_REPORT = 0
+SYN_DROPPED = 3
+
+# Relative axes
+REL_X = 0x00
+REL_Y = 0x01
+REL_HWHEEL = 0x06
+REL_WHEEL = 0x08
+REL_CNT = 0x10
+
+# Mouse buttons
+BTN_LEFT = 0x110
+BTN_RIGHT = 0x111
+BTN_MIDDLE = 0x112
+
+# Keys used to recognise keyboards
+KEY_A = 30
+KEY_SPACE = 57
+KEY_CNT = 0x300
+
+# Bus types
+BUS_VIRTUAL = 0x06
@@ -0,0 +1,208 @@
+"""
+Input device discovery from sysfs, shared by both daemons and the config GUI.
+
+Opening every /dev/input node just to call capabilities() on it is slow on
+machines with many input nodes (docking stations easily expose 30+), and
+each open can block on slow Bluetooth or virtual devices. The kernel
+already publishes names, ids and capability bitmaps in
+/proc/bus/input/devices and under /sys/class/input, so callers can pick
+the nodes they want from InputNode records and open only those.
+"""
+
+import os
+import re
+import struct
+
+from input_codes import EV_KEY, EV_REL, KEY_A, KEY_SPACE, BUS_VIRTUAL
+
+SYSFS_ROOT = "/sys/class/input"
+PROC_DEVICES = "/proc/bus/input/devices"
+DEV_ROOT = "/dev/input"
+
+# Capability bitmaps are printed as space separated longs, most significant first
+BITS_PER_LONG = struct.calcsize("l") * 8
+
+_EVENT_NODE = re.compile(r"event(\d+)$")
+
+
+def parse_bitmap(text):
+    """Turn a kernel bitmap ("10000 0 ff") into an int with bit N = code N."""
+    value = 0
+    for word in text.split():
+        value = (value << BITS_PER_LONG) | int(word, 16)
+    return value
+
+
+class InputNode:
+    """What the kernel reports about one evdev node, without opening it."""
+
+    __slots__ = ("path", "name", "phys", "uniq", "bustype", "vendor", "product",
+                 "version", "ev", "key", "rel", "props", "sysfs")
+
+    def __init__(self, path, name="", phys="", uniq="", bustype=0, vendor=0, product=0,
+                 version=0, ev=0, key=0, rel=0, props=0, sysfs=None):
+        self.path = path
+        self.name = name
+        self.phys = phys
+        self.uniq = uniq
+        self.bustype = bustype
+        self.vendor = vendor
+        self.product = product
+        self.version = version
+        self.ev = ev
+        self.key = key
+        self.rel = rel
+        self.props = props
+        self.sysfs = sysfs
+
+    def has_ev(self, etype):
+        return bool(self.ev >> etype & 1)
+
+    def has_key(self, code):
+        return bool(self.key >> code & 1)
+
+    def has_rel(self, code):
+        return bool(self.rel >> code & 1)
+
+    @property
+    def is_mouse(self):
+        """Supports relative movement (mice, trackballs, many touchpads' trackpoints)."""
+        return self.has_ev(EV_REL)
+
+    @property
+    def is_keyboard(self):
+        return self.has_ev(EV_KEY) and self.has_key(KEY_A) and self.has_key(KEY_SPACE)
+
+    @property
+    def is_virtual(self):
+        return self.bustype == BUS_VIRTUAL
+
+    def __repr__(self):
+        return f"InputNode({self.path!r}, {self.name!r})"
+
+
+def _read(path, default=""):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return default
+
+
+def _read_hex(path):
+    try:
+        return int(_read(path, "0"), 16)
+    except ValueError:
+        return 0
+
+
+def read_sysfs_node(event_dir, dev_root=DEV_ROOT):
+    """Build an InputNode from /sys/class/input/eventN (None if it vanished)."""
+    device = os.path.join(event_dir, "device")
+    if not os.path.isdir(device):
+        return None
+    caps = os.path.join(device, "capabilities")
+    ids = os.path.join(device, "id")
+    return InputNode(
+        path=os.path.join(dev_root, os.path.basename(event_dir)),
+        name=_read(os.path.join(device, "name")),
+        phys=_read(os.path.join(device, "phys")),
+        uniq=_read(os.path.join(device, "uniq")),
+        bustype=_read_hex(os.path.join(ids, "bustype")),
+        vendor=_read_hex(os.path.join(ids, "vendor")),
+        product=_read_hex(os.path.join(ids, "product")),
+        version=_read_hex(os.path.join(ids, "version")),
+        ev=parse_bitmap(_read(os.path.join(caps, "ev"), "0")),
+        key=parse_bitmap(_read(os.path.join(caps, "key"), "0")),
+        rel=parse_bitmap(_read(os.path.join(caps, "rel"), "0")),
+        props=parse_bitmap(_read(os.path.join(device, "properties"), "0")),
+        sysfs=event_dir,
+    )
+
+
+def _node_sort_key(name):
+    match = _EVENT_NODE.search(name)
+    return int(match.group(1)) if match else -1
+
+
+def list_sysfs_nodes(sysfs_root=SYSFS_ROOT, dev_root=DEV_ROOT):
+    """InputNodes for every eventN under sysfs_root, in node order."""
+    try:
+        names = [name for name in os.listdir(sysfs_root) if _EVENT_NODE.match(name)]
+    except OSError:
+        return []
+    nodes = []
+    for name in sorted(names, key=_node_sort_key):
+        node = read_sysfs_node(os.path.join(sysfs_root, name), dev_root)
+        if node:
+            nodes.append(node)
+    return nodes
+
+
+def list_proc_nodes(proc_path=PROC_DEVICES, dev_root=DEV_ROOT, sysfs_root=SYSFS_ROOT):
+    """InputNodes parsed from /proc/bus/input/devices."""
+    try:
+        with open(proc_path) as f:
+            text = f.read()
+    except OSError:
+        return []
+    nodes = []
+    for block in text.split("\n\n"):
+        node = InputNode(path=None)
+        for line in block.splitlines():
+            if len(line) < 3 or line[1] != ":":
+                continue
+            kind, rest = line[0], line[3:]
+            if kind == "I":
+                fields = dict(item.split("=", 1) for item in rest.split() if "=" in item)
+                node.bustype = int(fields.get("Bus", "0"), 16)
+                node.vendor = int(fields.get("Vendor", "0"), 16)
+                node.product = int(fields.get("Product", "0"), 16)
+                node.version = int(fields.get("Version", "0"), 16)
+            elif kind == "N":
+                node.name = rest.partition("=")[2].strip('"')
+            elif kind == "P":
+                node.phys = rest.partition("=")[2]
+            elif kind == "U":
+                node.uniq = rest.partition("=")[2]
+            elif kind == "H":
+                for handler in rest.partition("=")[2].split():
+                    if _EVENT_NODE.match(handler):
+                        node.path = os.path.join(dev_root, handler)
+                        node.sysfs = os.path.join(sysfs_root, handler)
+            elif kind == "B":
+                bitmap, _, value = rest.partition("=")
+                if bitmap == "EV":
+                    node.ev = parse_bitmap(value)
+                elif bitmap == "KEY":
+                    node.key = parse_bitmap(value)
+                elif bitmap == "REL":
+                    node.rel = parse_bitmap(value)
+                elif bitmap == "PROP":
+                    node.props = parse_bitmap(value)
+        if node.path:
+            nodes.append(node)
+    nodes.sort(key=lambda node: _node_sort_key(node.path))
+    return nodes
+
+
+def list_input_nodes(sysfs_root=SYSFS_ROOT, proc_path=PROC_DEVICES, dev_root=DEV_ROOT):
+    """All evdev nodes the kernel knows about.
+
+    /proc/bus/input/devices describes every node in a single read, which is
+    about ten times cheaper than walking a dozen sysfs files per node, so it
+    is preferred; sysfs is the fallback where /proc is not mounted.
+    """
+    return list_proc_nodes(proc_path, dev_root, sysfs_root) or list_sysfs_nodes(sysfs_root, dev_root)
+
+
+def read_input_node(path, sysfs_root=SYSFS_ROOT):
+    """InputNode for a single /dev/input/eventN path (e.g. after hotplug)."""
+    node = read_sysfs_node(os.path.join(sysfs_root, os.path.basename(path)),
+                           os.path.dirname(path))
+    if node:
+        return node
+    for node in list_proc_nodes(dev_root=os.path.dirname(path)):
+        if node.path == path:
+            return node
+    return None
@@ -0,0 +1,309 @@
+"""
+One reader per physical input device, shared by pluggable handlers.
+
+InputHub opens each device once, grabs it if any handler needs it
+exclusively, and hands every read batch to the handlers that asked for
+that device. Hotplugged devices are offered to the handlers the same way,
+and deferred work runs on the hub's TimerQueue, so all handlers share one
+process, one selector and one wakeup per event.
+
+A handler implements:
+    wants(node)             READ, GRAB or None for an InputNode
+    start(devices)          the devices it was given at startup, before attach
+    attach(device)          start handling a device; False to decline it
+    detach(device)          device lost or shutting down
+    handle(device, events)  one read batch (a list when several handlers share it)
+    close()                 hub is shutting down, after every device is detached
+
+and optionally handle_raw(device, data, types, codes): the batch as raw
+input_event structs (see raw_input.py). Devices whose handlers all have it
+are read without creating an object per event, unless capturing.
+"""
+
+import os
+import selectors
+import time
+
+import evdev
+
+from device_watch import DeviceWatcher
+from event_capture import CaptureWriter
+from event_clock import use_monotonic_clock
+from input_discovery import list_input_nodes, read_input_node
+from raw_input import RawReader
+from timer_queue import TimerQueue
+
+READ = 1
+GRAB = 2
+
+# Hotplugged nodes that cannot be opened yet are retried this often
+ATTACH_RETRY_DELAY = 0.05
+ATTACH_RETRIES = 20
+
+
+class InputHub:
+    """Reads every device the handlers need and dispatches the events."""
+
+    def __init__(self, log, capture_path=None, raw_input=True):
+        self.log = log
+        self.raw_input = raw_input
+        self.capture_path = capture_path
+        self.handlers = []
+        self.devices = {}  # path -> open InputDevice
+        self.routes = {}  # fd -> handlers that get the device's events
+        self.wanted = {}  # fd -> (handler, mode) pairs the device was attached for
+        self.grabbed = set()  # fds of grabbed devices
+        self.readers = {}  # fd -> RawReader for devices read without python-evdev
+        self.device_ids = {}  # fd -> capture device id
+        self.next_device_id = 0
+        self.sel = selectors.DefaultSelector()
+        self.watcher = None
+        self.capture = None
+
+        # Deferred actions (modifier release after a snap commit, hotplug
+        # retries) run from the selector timeout instead of sleeping in the loop
+        self.timers = TimerQueue()
+
+    def add_handler(self, handler):
+        """Handlers get events in the order they were added."""
+        self.handlers.append(handler)
+
+    def wanted_by(self, node):
+        """(handler, mode) pairs for the handlers that want node."""
+        wanted = []
+        for handler in self.handlers:
+            mode = handler.wants(node)
+            if mode:
+                wanted.append((handler, mode))
+        return wanted
+
+    def start(self):
+        """Open the devices the handlers want, start the handlers and attach."""
+        opened = []
+        for node in list_input_nodes():
+            wanted = self.wanted_by(node)
+            if not wanted:
+                continue
+            try:
+                opened.append((evdev.InputDevice(node.path), wanted))
+            except (PermissionError, OSError):
+                pass
+
+        for handler in self.handlers:
+            handler.start([device for device, wanted in opened
+                           if any(h is handler for h, mode in wanted)])
+
+        # Optional raw event capture; device ids follow attach order
+        if self.capture_path:
+            self.capture = CaptureWriter(self.capture_path)
+            self.log.info("Capturing events to %s", self.capture_path)
+
+        for device, wanted in opened:
+            self.attach(device, wanted)
+
+        # Devices plugged in later (or receivers that re-enumerate) are picked up in place
+        try:
+            self.watcher = DeviceWatcher()
+            self.add_reader(self.watcher, self.on_hotplug)
+        except OSError as err:
+            self.log.warning("Hotplug disabled, cannot watch /dev/input: %s", err)
+
+    def add_reader(self, fileobj, callback):
+        """Call callback() from the loop whenever fileobj is readable."""
+        self.sel.register(fileobj, selectors.EVENT_READ, callback)
+
+    def remove_reader(self, fileobj):
+        self.sel.unregister(fileobj)
+
+    def rescan(self):
+        """Offer every device again after handlers changed what they want.
+
+        Devices whose handlers and modes are unchanged are left alone, so a
+        new device filter only grabs or releases the devices it affects.
+        """
+        nodes = list_input_nodes()
+        wanted = {node.path: self.wanted_by(node) for node in nodes}
+        for device in list(self.devices.values()):
+            if wanted.get(device.path, []) != self.wanted.get(device.fd):
+                self.detach(device)
+        for node in nodes:
+            if node.path in self.devices or not wanted[node.path]:
+                continue
+            try:
+                device = evdev.InputDevice(node.path)
+            except OSError:
+                continue
+            self.attach(device, wanted[node.path])
+
+    def attach(self, device, wanted):
+        """Grab device if needed and hand it to the handlers. Returns False if none took it."""
+        # WARNING: If this crashes, a grabbed mouse might be unresponsive until reboot or ungrab
+        # Handlers time gestures and latency from event timestamps on CLOCK_MONOTONIC
+        try:
+            if not use_monotonic_clock(device.fd):
+                self.log.warning("%s: kernel timestamps stay on the wall clock", device.name)
+        except OSError as err:
+            # Typically ENODEV: a re-enumerating receiver's node already went away
+            self.log.warning("Could not set up %s (%s): %s", device.name, device.path, err)
+            device.close()
+            return False
+
+        requested = wanted
+        grab = any(mode == GRAB for handler, mode in wanted)
+        if grab:
+            try:
+                device.grab()
+            except OSError as err:
+                self.log.error("Could not grab %s: %s", device.name, err)
+                wanted = [(handler, mode) for handler, mode in wanted if mode != GRAB]
+                grab = False
+
+        handlers = []
+        keep_grab = False
+        for handler, mode in wanted:
+            if handler.attach(device):
+                handlers.append(handler)
+                keep_grab = keep_grab or mode == GRAB
+        if grab and not keep_grab:
+            # Only readers took it; never keep a device from the desktop for them
+            device.ungrab()
+        grab = keep_grab
+        if not handlers:
+            device.close()
+            return False
+
+        self.routes[device.fd] = handlers
+        self.wanted[device.fd] = requested
+        if self.raw_input and not self.capture and all(hasattr(h, "handle_raw") for h in handlers):
+            self.readers[device.fd] = RawReader(device.fd)
+        self.devices[device.path] = device
+        if grab:
+            self.grabbed.add(device.fd)
+        self.sel.register(device, selectors.EVENT_READ)
+        device_id = self.next_device_id
+        self.next_device_id += 1
+        self.device_ids[device.fd] = device_id
+
+        if self.capture:
+            self.log.info("Capturing device %d: %s (%s)", device_id, device.name, device.path)
+        self.log.info("%s %s (%s)", "Grabbed" if grab else "Reading", device.name, device.path)
+        return True
+
+    def detach(self, device):
+        """Stop reading a device (lost or shutting down)."""
+        source = device.fd
+        for handler in self.routes.pop(source, ()):
+            handler.detach(device)
+        self.wanted.pop(source, None)
+        self.readers.pop(source, None)
+        self.device_ids.pop(source, None)
+        self.devices.pop(device.path, None)
+        try:
+            self.sel.unregister(device)
+        except (KeyError, ValueError):
+            pass
+        if source in self.grabbed:
+            self.grabbed.discard(source)
+            try:
+                device.ungrab()
+            except:
+                pass
+        device.close()
+
+    def on_hotplug(self):
+        """Offer input nodes that appeared in /dev/input to the handlers."""
+        noticed = time.monotonic()
+        for path in self.watcher.read():
+            if path not in self.devices:
+                self.try_attach(path, noticed, ATTACH_RETRIES)
+
+    def try_attach(self, path, noticed, retries):
+        if path in self.devices or not os.path.exists(path):
+            return
+        node = read_input_node(path)
+        device = None
+        if node is not None:
+            wanted = self.wanted_by(node)
+            if not wanted:
+                return
+            try:
+                device = evdev.InputDevice(path)
+            except OSError:
+                pass
+        if device is None:
+            # Not in sysfs yet, or udev is still setting the node up
+            if retries:
+                self.timers.call_later(ATTACH_RETRY_DELAY, self.try_attach, path, noticed, retries - 1)
+            return
+        if self.attach(device, wanted):
+            elapsed = (time.monotonic() - noticed) * 1000
+            self.log.info("Hotplug: attached %s in %.1f ms", device.name, elapsed)
+
+    def run(self):
+        """Dispatch events until interrupted; always cleans up."""
+        try:
+            self.loop()
+        except KeyboardInterrupt:
+            self.log.info("Stopping...")
+        finally:
+            self.close()
+
+    def loop(self):
+        sel = self.sel
+        timers = self.timers
+        routes = self.routes
+        readers = self.readers
+        capture = self.capture
+        device_ids = self.device_ids
+
+        while True:
+            for key, mask in sel.select(timers.timeout()):
+                if key.data:
+                    # Hotplug watch and other non-device readers
+                    key.data()
+                    continue
+                device = key.fileobj
+                source = device.fd
+                handlers = routes.get(source)
+                if handlers is None:
+                    # Detached earlier in this batch (a control command or
+                    # reload rescanned); a closed device's fd is -1
+                    continue
+                reader = readers.get(source)
+                try:
+                    if reader:
+                        data = reader.read()
+                        types = reader.types(data)
+                        codes = reader.codes(data)
+                        for handler in handlers:
+                            handler.handle_raw(device, data, types, codes)
+                        continue
+                    events = device.read()
+                    if capture:
+                        events = capture.record(device_ids[source], events)
+                    elif len(handlers) > 1:
+                        events = list(events)
+                    for handler in handlers:
+                        handler.handle(device, events)
+                except BlockingIOError:
+                    pass
+                except OSError:
+                    # Device lost; it is attached again if it comes back
+                    self.log.warning("Lost %s (%s)", device.name, device.path)
+                    self.detach(device)
+
+            timers.run_due()
+
+    def close(self):
+        # Never leave a modifier stuck down
+        self.timers.run_all()
+        if self.capture:
+            self.capture.close()
+            self.log.info("Captured %d events", self.capture.count)
+        if self.watcher:
+            self.watcher.close()
+        # Ungrab everything to restore the mice
+        for device in list(self.devices.values()):
+            self.detach(device)
+        for handler in self.handlers:
+            handler.close()
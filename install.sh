@@ -24,6 +24,8 @@ SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 INSTALL_DIR="/opt/tiling-rightclick"
 CONFIG_DIR="/etc/tiling-rightclick"
 SERVICE_NAME="tiling-rightclick.service"
+# Helper modules imported by the daemon (installed next to it)
+DAEMON_MODULES="input_codes.py frame_forwarder.py timer_queue.py rightclick_gesture.py event_capture.py latency_trace.py device_watch.py input_discovery.py daemon_log.py input_hub.py super_tap.py event_clock.py control_socket.py realtime.py raw_output.py raw_input.py motion_coalesce.py"
 
 echo -e "${YELLOW}[1/7]${NC} Installing dependencies..."
 if command -v apt-get &> /dev/null; then
@@ -44,6 +46,9 @@ mkdir -p "$CONFIG_DIR"
 echo -e "${YELLOW}[3/7]${NC} Copying daemon..."
 cp "$SCRIPT_DIR/tiling-rightclick.py" "$INSTALL_DIR/"
 chmod +x "$INSTALL_DIR/tiling-rightclick.py"
+for module in $DAEMON_MODULES; do
+    cp "$SCRIPT_DIR/$module" "$INSTALL_DIR/"
+done
 
 echo -e "${YELLOW}[4/7]${NC} Copying configuration GUI..."
 cp "$SCRIPT_DIR/tiling-rightclick-config.py" "$INSTALL_DIR/"
@@ -58,6 +63,7 @@ if [ ! -f "$CONFIG_DIR/config.json" ]; then
 {
   "device_name": "",
   "modifier_key": "KEY_LEFTMETA",
+  "commit_delay_ms": 50,
   "show_indicator": true
 }
 CONFIGEOF
@@ -80,6 +86,9 @@ After=graphical.target
 [Service]
 Type=simple
 ExecStart=/usr/bin/python3 $INSTALL_DIR/tiling-rightclick.py
+ExecReload=/bin/kill -HUP \$MAINPID
+# Holds the control socket (control.sock)
+RuntimeDirectory=tiling-rightclick
 Restart=on-failure
 RestartSec=5
 StandardOutput=journal
@@ -112,5 +121,6 @@ echo "Commands:"
 echo "  sudo systemctl status $SERVICE_NAME   # Check status"
 echo "  sudo systemctl stop $SERVICE_NAME     # Stop daemon"
 echo "  sudo systemctl restart $SERVICE_NAME  # Restart daemon"
+echo "  sudo systemctl reload $SERVICE_NAME   # Re-read config.json"
 echo ""
 
@@ -0,0 +1,119 @@
+"""
+Per-event forwarding latency tracing for the tiling-rightclick proxy.
+
+LatencyTracer measures, for every forwarded event, the time between the
+kernel timestamp on the source event and the moment its frame was written
+to the UInput device. Samples go into HDR-style log-linear histograms
+(fixed relative precision, constant-time record) split by event class,
+and are reported as p50/p99/p99.9/max.
+"""
+
+import time
+
+from input_codes import EV_SYN, EV_KEY, EV_REL, SYN_REPORT
+
+# Sub-buckets per power of two; 32 keeps every bucket within ~3% of its value
+SUB_BITS = 5
+SUB_BUCKETS = 1 << SUB_BITS
+
+PERCENTILES = (50.0, 99.0, 99.9)
+
+
+class LatencyHistogram:
+    """Log-linear histogram of non-negative integer samples (microseconds)."""
+
+    __slots__ = ("counts", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (SUB_BUCKETS * 2)
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        if value < 0:
+            value = 0  # Clock stepped backwards; count it as immediate
+        if value < SUB_BUCKETS:
+            index = value
+        else:
+            shift = value.bit_length() - SUB_BITS - 1
+            index = shift * SUB_BUCKETS + (value >> shift)
+        counts = self.counts
+        if index >= len(counts):
+            counts.extend([0] * (index + 1 - len(counts)))
+        counts[index] += 1
+        self.total += 1
+        if value > self.max:
+            self.max = value
+
+    @staticmethod
+    def bucket_high(index):
+        """Highest value that falls into bucket index."""
+        if index < SUB_BUCKETS * 2:
+            return index
+        shift, mantissa = divmod(index, SUB_BUCKETS)
+        shift -= 1
+        mantissa += SUB_BUCKETS
+        return ((mantissa + 1) << shift) - 1
+
+    def percentile(self, pct):
+        if not self.total:
+            return 0
+        wanted = max(1, -(-self.total * pct // 100))  # ceil without floats drifting
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= wanted:
+                return min(self.bucket_high(index), self.max)
+        return self.max
+
+
+class LatencyTracer:
+    """Collects kernel-to-uinput latency for motion, button and modifier events."""
+
+    CLASSES = ("motion", "button", "modifier")
+
+    def __init__(self, modifier_key, clock=time.time_ns):
+        # evdev timestamps are CLOCK_REALTIME unless EVIOCSCLOCKID says otherwise
+        self.clock = clock
+        self.modifier_key = modifier_key
+        self.histograms = {name: LatencyHistogram() for name in self.CLASSES}
+        self.pending = {}  # source -> [(histogram, stamp_us)] awaiting their SYN_REPORT
+
+    def observe(self, source, sec, usec, outputs):
+        """Account for the outputs produced by one source event.
+
+        Must be called after the outputs were pushed to the forwarder, so
+        a SYN_REPORT among them means the frame has just been written.
+        """
+        stamp = sec * 1_000_000 + usec
+        pending = self.pending.get(source)
+        if pending is None:
+            pending = self.pending[source] = []
+        histograms = self.histograms
+        for etype, code, value in outputs:
+            if etype == EV_REL:
+                pending.append((histograms["motion"], stamp))
+            elif etype == EV_KEY:
+                name = "modifier" if code == self.modifier_key else "button"
+                pending.append((histograms[name], stamp))
+            elif etype == EV_SYN and code == SYN_REPORT:
+                if pending:
+                    now = self.clock() // 1000
+                    for histogram, event_stamp in pending:
+                        histogram.record(now - event_stamp)
+                    pending.clear()
+
+    def discard(self, source):
+        self.pending.pop(source, None)
+
+    def report(self):
+        """Human-readable summary lines, one per event class."""
+        lines = ["Latency (kernel timestamp -> uinput write), microseconds:"]
+        for name in self.CLASSES:
+            histogram = self.histograms[name]
+            if not histogram.total:
+                lines.append(f"  {name:<9} no samples")
+                continue
+            stats = "  ".join(f"p{pct:g}={histogram.percentile(pct)}" for pct in PERCENTILES)
+            lines.append(f"  {name:<9} n={histogram.total}  {stats}  max={histogram.max}")
+        return lines
@@ -0,0 +1,98 @@
+"""
+Backlog coalescing of pointer motion for the tiling-rightclick proxy.
+
+When the machine stalls, a mouse keeps queueing frames (1000 or more per
+second) and the proxy forwards them one by one once it runs again: the
+pointer replays the whole trail late instead of jumping to where it is
+now. coalesce() merges each run of consecutive frames that hold nothing
+but REL_X/REL_Y into a single frame with the summed deltas, so the
+compositor gets the same total movement at once. Any other frame (buttons,
+wheels, anything else) ends the run and is kept exactly as it was, in
+order, so clicks still land between the movements they came between.
+
+The proxy only does this for reads whose first event is older than the
+configured threshold; see TilingRightclickProxy.backlogged().
+"""
+
+from input_codes import EV_SYN, EV_REL, SYN_REPORT, REL_X, REL_Y
+from raw_input import RawEvent
+
+# Kernel stamps further back than this are on the wall clock (the device
+# refused CLOCK_MONOTONIC, see event_clock.py), not a backlog
+MAX_BACKLOG_NS = 60 * 1_000_000_000
+
+
+def is_motion(frame):
+    """Whether a frame (without its SYN_REPORT) is relative X/Y motion only."""
+    if not frame:
+        return False
+    for event in frame:
+        if event.type != EV_REL or (event.code != REL_X and event.code != REL_Y):
+            return False
+    return True
+
+
+def merge(run):
+    """One frame (events and SYN_REPORT) for a run of motion frames.
+
+    The merged frame carries the last frame's timestamp; an axis that sums
+    to zero is left out.
+    """
+    dx = dy = 0
+    for frame, _ in run:
+        for event in frame:
+            if event.code == REL_X:
+                dx += event.value
+            else:
+                dy += event.value
+    syn = run[-1][1]
+    merged = []
+    if dx:
+        merged.append(RawEvent(syn.sec, syn.usec, EV_REL, REL_X, dx))
+    if dy:
+        merged.append(RawEvent(syn.sec, syn.usec, EV_REL, REL_Y, dy))
+    merged.append(syn)
+    return merged
+
+
+def emit(out, run):
+    """Append a run of motion frames to out, merged. Returns the frames saved."""
+    if len(run) == 1:
+        frame, syn = run[0]
+        out.extend(frame)
+        out.append(syn)
+        return 0
+    out.extend(merge(run))
+    return len(run) - 1
+
+
+def coalesce(events, continued=False):
+    """Merge runs of consecutive motion-only frames in a read batch.
+
+    Returns (events, frames merged away). continued means the batch starts
+    in the middle of a frame whose first events were already forwarded;
+    that frame is never merged. A trailing partial frame is kept as is.
+    """
+    out = []
+    run = []  # (frame, SYN_REPORT event) of consecutive motion frames
+    saved = 0
+    frame = []
+    first = continued
+    for event in events:
+        if event.type != EV_SYN or event.code != SYN_REPORT:
+            frame.append(event)
+            continue
+        if not first and is_motion(frame):
+            run.append((frame, event))
+        else:
+            if run:
+                saved += emit(out, run)
+                run = []
+            out.extend(frame)
+            out.append(event)
+        first = False
+        frame = []
+    if run:
+        saved += emit(out, run)
+    out.extend(frame)
+    return out, saved
@@ -0,0 +1,112 @@
+"""
+Allocation-free reads from input devices for the input hub.
+
+python-evdev's read() builds a list of tuples and then an InputEvent
+object per event, in Python, only for the proxy to look at type/code/value
+and write the same numbers out again. RawReader instead readv()s whole
+struct input_event records into one reused buffer and returns a prebuilt
+memoryview of them; no per-event (or, for a given batch size, per-read)
+object is created. Handlers that implement
+handle_raw(device, data, types, codes) get the batch and its type and code
+fields and take it from there:
+
+    EV_KEY in types             any key or button in the batch? (scans in C)
+    SYN_DROPPED in codes        a possible overflow (any type with code 3)
+    count_reports(data)         frames the batch ends (a few objects per call)
+    EVENT.iter_unpack(data)     (sec, usec, type, code, value) tuples
+    decode(data)                InputEvent-like objects for handle()
+
+The proxy forwards motion-only batches to its RawOutput as the same bytes;
+only batches with a button in them are decoded.
+"""
+
+import os
+import struct
+import sys
+
+from raw_output import EVENT_SIZE, TIME_SIZE, PAYLOAD
+
+# struct input_event as read: sec, usec, type, code, value
+EVENT = struct.Struct("@llHHi")
+
+# Events per read; python-evdev reads up to 64 at a time as well
+READ_EVENTS = 64
+
+# Position of the type and code fields in a buffer viewed as unsigned shorts
+TYPE_INDEX = TIME_SIZE // 2
+CODE_INDEX = TYPE_INDEX + 1
+STRIDE = EVENT_SIZE // 2
+# Offset of the low byte of the type and code fields in an event; every
+# type and every EV_SYN code fits in it
+TYPE_BYTE = TIME_SIZE + (sys.byteorder == "big")
+CODE_BYTE = TYPE_BYTE + 2
+
+
+class RawEvent:
+    """Stands in for evdev.InputEvent where a handler needs objects."""
+
+    __slots__ = ("sec", "usec", "type", "code", "value")
+
+    def __init__(self, sec, usec, etype, code, value):
+        self.sec = sec
+        self.usec = usec
+        self.type = etype
+        self.code = code
+        self.value = value
+
+
+def decode(data):
+    """InputEvent-like objects for a raw batch."""
+    return [RawEvent(*fields) for fields in EVENT.iter_unpack(data)]
+
+
+def last_event(data):
+    """(type, code, value) of the last event in a raw batch."""
+    return PAYLOAD.unpack_from(data, len(data) - EVENT_SIZE + TIME_SIZE)
+
+
+def count_reports(data):
+    """Number of SYN_REPORTs (frame ends) in a raw batch, without decoding it.
+
+    One byte per event is zero exactly when both its type and code are:
+    the type and code low bytes are ORed as two integers and the zero
+    bytes of the result counted, all in C.
+    """
+    types = int.from_bytes(data[TYPE_BYTE::EVENT_SIZE], "little")
+    codes = int.from_bytes(data[CODE_BYTE::EVENT_SIZE], "little")
+    return (types | codes).to_bytes(len(data) // EVENT_SIZE, "little").count(0)
+
+
+class RawReader:
+    """Reads a device's events into a reused buffer."""
+
+    def __init__(self, fd, capacity=READ_EVENTS):
+        self.fd = fd
+        self.buf = bytearray(EVENT_SIZE * capacity)
+        self.buffers = [self.buf]
+        view = memoryview(self.buf)
+        # One view per possible batch size, built once: views[n] is the first
+        # n events, type_views[n] and code_views[n] their type and code fields
+        self.views = [view[:EVENT_SIZE * n] for n in range(capacity + 1)]
+        words = view.cast("H")
+        self.type_views = [words[TYPE_INDEX:STRIDE * n:STRIDE] for n in range(capacity + 1)]
+        self.code_views = [words[CODE_INDEX:STRIDE * n:STRIDE] for n in range(capacity + 1)]
+
+    def read(self):
+        """The events read, valid until the next read().
+
+        Raises BlockingIOError if nothing is pending and OSError if the
+        device is gone, like python-evdev.
+        """
+        size = os.readv(self.fd, self.buffers)
+        if not size:
+            raise OSError("end of file on input device")
+        return self.views[size // EVENT_SIZE]
+
+    def types(self, data):
+        """The type fields of a batch returned by read()."""
+        return self.type_views[len(data) // EVENT_SIZE]
+
+    def codes(self, data):
+        """The code fields of a batch returned by read()."""
+        return self.code_views[len(data) // EVENT_SIZE]
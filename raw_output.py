@@ -0,0 +1,82 @@
+"""
+Whole-frame writes to a uinput device for the tiling-rightclick proxy.
+
+python-evdev's UInput.write() is one call into its C wrapper and one
+write(2) per event, SYN_REPORT included. RawOutput packs a whole frame of
+struct input_event into a preallocated buffer and hands it to the uinput
+fd in a single os.write(); uinput takes any number of events per write.
+Creating, configuring and closing the device stay with the wrapped UInput.
+
+FrameForwarder uses write_frame() whenever its output has one; write() and
+syn() keep the UInput interface for everything else.
+"""
+
+import os
+import struct
+
+from input_codes import EV_SYN, SYN_REPORT
+
+# struct input_event: struct timeval (two longs), __u16 type, __u16 code,
+# __s32 value. The time stays zero (uinput stamps events itself), so only
+# type, code and value are packed, at offset 16 of each slot.
+EVENT_SIZE = struct.calcsize("@llHHi")
+TIME_SIZE = struct.calcsize("@ll")
+PAYLOAD = struct.Struct("@HHi")
+
+# Events per frame the buffer holds before it has to grow
+FRAME_EVENTS = 32
+
+
+class RawOutput:
+    """Writes frames to a uinput fd with one write(2) each."""
+
+    def __init__(self, uinput, capacity=FRAME_EVENTS):
+        self.uinput = uinput
+        self.fd = uinput.fd
+        self.resize(capacity)
+
+    @classmethod
+    def wrap(cls, uinput):
+        """RawOutput for uinput, or uinput itself if its fd is not reachable."""
+        fd = getattr(uinput, "fd", None)
+        if not isinstance(fd, int) or fd < 0:
+            return uinput
+        return cls(uinput)
+
+    def resize(self, capacity):
+        self.capacity = capacity
+        self.buf = bytearray(EVENT_SIZE * capacity)
+        view = memoryview(self.buf)
+        # views[n] is the first n events; no slicing per frame
+        self.views = [view[:EVENT_SIZE * n] for n in range(capacity + 1)]
+
+    def write_frame(self, events):
+        """Write events followed by one SYN_REPORT."""
+        count = len(events) + 1
+        if count > self.capacity:
+            self.resize(count * 2)
+        buf = self.buf
+        pack_into = PAYLOAD.pack_into
+        offset = TIME_SIZE
+        for etype, code, value in events:
+            pack_into(buf, offset, etype, code, value)
+            offset += EVENT_SIZE
+        pack_into(buf, offset, EV_SYN, SYN_REPORT, 0)
+        self.send(self.views[count])
+
+    def send(self, view):
+        written = os.write(self.fd, view)
+        # uinput consumes whole events; a short write leaves the rest to send
+        while written < len(view):
+            view = view[written:]
+            written = os.write(self.fd, view)
+
+    def write(self, etype, code, value):
+        PAYLOAD.pack_into(self.buf, TIME_SIZE, etype, code, value)
+        self.send(self.views[1])
+
+    def syn(self):
+        self.write(EV_SYN, SYN_REPORT, 0)
+
+    def close(self):
+        self.uinput.close()
@@ -0,0 +1,101 @@
+"""
+Opt-in latency tuning for the proxy daemon.
+
+The proxy sits between every mouse and the compositor, so when the machine
+is busy (builds, VMs) scheduler delays and collector pauses show up as
+pointer jitter. tune() applies whatever the config asks for; each step is
+independent, and a step the kernel refuses is logged and skipped:
+
+    realtime_priority   1-99 runs the event loop under SCHED_FIFO (or
+                        SCHED_RR with "sched_policy": "rr"); 0 is off
+    cpu_affinity        CPUs the event loop may run on, e.g. [2, 3]
+    lock_memory         mlockall(), so no page the loop touches is swapped out
+    gc_tuning           freeze what startup allocated and take full
+                        collections out of the event path
+
+Call it from the event loop thread once startup is done. Scheduling policy
+and affinity are per thread: the log thread, started earlier, stays at
+normal priority. The kernel's RT throttling (sched_rt_runtime_us) still
+leaves other tasks some CPU should the loop ever spin.
+"""
+
+import ctypes
+import ctypes.util
+import gc
+import os
+
+POLICIES = {"fifo": os.SCHED_FIFO, "rr": os.SCHED_RR}
+
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+
+# With gc_tuning, full collections only run from this timer; after the
+# freeze they only scan what was allocated since startup
+FULL_GC_INTERVAL = 600.0
+# Generation 2 threshold that is never reached in practice
+NO_FULL_GC = 1 << 30
+
+
+def set_realtime(priority, policy="fifo"):
+    """Run the calling thread under a real-time policy. Raises OSError."""
+    policy = POLICIES[policy]
+    # The config loader lets a float through where the default is an int
+    priority = int(priority)
+    priority = max(os.sched_get_priority_min(policy), min(priority, os.sched_get_priority_max(policy)))
+    os.sched_setscheduler(0, policy, os.sched_param(priority))
+    return priority
+
+
+def lock_memory():
+    """mlockall() current and future pages. Raises OSError."""
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    if libc.mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+        err = ctypes.get_errno()
+        raise OSError(err, f"mlockall: {os.strerror(err)}")
+
+
+def tune_gc():
+    """Move startup objects out of the collector's reach and stop automatic full collections."""
+    gc.collect()
+    gc.freeze()
+    gen0, gen1, _ = gc.get_threshold()
+    gc.set_threshold(gen0, gen1, NO_FULL_GC)
+
+
+def collect_full(timers):
+    gc.collect()
+    timers.call_later(FULL_GC_INTERVAL, collect_full, timers)
+
+
+def tune(config, log, timers=None):
+    """Apply the tuning config asks for. timers gets the periodic full collection."""
+    priority = config.get("realtime_priority", 0)
+    if priority:
+        policy = config.get("sched_policy", "fifo")
+        try:
+            priority = set_realtime(priority, policy)
+            log.info("Real-time: SCHED_%s priority %d", policy.upper(), priority)
+        except (KeyError, OSError, TypeError, ValueError) as err:
+            log.warning("Could not set real-time priority %s/%s: %s", policy, priority, err)
+
+    cpus = config.get("cpu_affinity")
+    if cpus:
+        try:
+            os.sched_setaffinity(0, cpus)
+            log.info("CPU affinity: %s", sorted(os.sched_getaffinity(0)))
+        except (OSError, TypeError, ValueError) as err:
+            log.warning("Could not set CPU affinity %s: %s", cpus, err)
+
+    if config.get("lock_memory", False):
+        try:
+            lock_memory()
+            log.info("Memory locked (mlockall)")
+        except OSError as err:
+            log.warning("Could not lock memory: %s", err)
+
+    if config.get("gc_tuning", False):
+        tune_gc()
+        if timers:
+            timers.call_later(FULL_GC_INTERVAL, collect_full, timers)
+        log.info("GC: %d startup objects frozen, full collections every %.0f s",
+                 gc.get_freeze_count(), FULL_GC_INTERVAL)
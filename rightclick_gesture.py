@@ -0,0 +1,116 @@
+"""
+Right-click-to-modifier gesture logic for the tiling-rightclick proxy.
+
+RightClickGesture is a pure state machine: it takes source events and
+returns the events the proxy should emit instead. It does no I/O, so it
+can be driven by recorded or synthetic streams without /dev/uinput (see
+tools/gesture_replay.py).
+"""
+
+from input_codes import EV_KEY, EV_SYN, EV_CNT, SYN_REPORT, SYN_DROPPED, BTN_LEFT, BTN_RIGHT
+
+# Returned by process() when a snap is committed: the window is dropped
+# (BTN_LEFT up, flushed as its own frame) while the modifier stays down.
+# The caller must call release_modifier() once the commit delay elapsed.
+COMMIT = ((EV_KEY, BTN_LEFT, 0), (EV_SYN, SYN_REPORT, 0))
+
+NOTHING = ()
+
+# How the proxy dispatches a source event: DISPATCH[type] is None when
+# every code of that type is passed through, else a dict of the codes that
+# are not. Only the left and right buttons drive the state machine, and
+# process() needs every edge of both in every state to track it; SYN_REPORT
+# completes a frame and SYN_DROPPED starts overflow recovery. Everything
+# else (motion, wheels, other buttons) comes out unchanged whatever the
+# state, so it is forwarded without calling process(). A list indexed by
+# type costs less per event than hashing a (type, code) tuple, and motion
+# never gets past the first lookup.
+FLUSH = 1
+GESTURE = 2
+DROPPED = 3
+DISPATCH = [None] * EV_CNT
+DISPATCH[EV_SYN] = {SYN_REPORT: FLUSH, SYN_DROPPED: DROPPED}
+DISPATCH[EV_KEY] = {BTN_LEFT: GESTURE, BTN_RIGHT: GESTURE}
+
+
+class RightClickGesture:
+    """While left is held, right-click becomes the configured modifier key."""
+
+    __slots__ = ("modifier_key", "left_held", "right_held", "super_sent", "release_pending")
+
+    def __init__(self, modifier_key):
+        self.modifier_key = modifier_key
+        self.left_held = False
+        self.right_held = False
+        self.super_sent = False  # Modifier pressed on behalf of a right-click
+        self.release_pending = False  # Snap committed, modifier release not yet sent
+
+    def process(self, etype, code, value):
+        """Return the events to emit for one source event."""
+        if etype != EV_KEY:
+            return ((etype, code, value),)
+
+        if code == BTN_LEFT:
+            self.left_held = (value == 1)
+            return ((etype, code, value),)
+
+        if code != BTN_RIGHT:
+            # Other buttons passed through
+            return ((etype, code, value),)
+
+        self.right_held = right_held = (value == 1)
+
+        # If Left is held, treat Right as the modifier
+        if self.left_held:
+            if right_held:
+                if self.super_sent:
+                    return NOTHING
+                self.super_sent = True
+                if self.release_pending:
+                    # Previous commit still holds the modifier down; keep it
+                    self.release_pending = False
+                    return NOTHING
+                return ((EV_KEY, self.modifier_key, 1),)
+
+            if self.super_sent:
+                # Right released in "Snap Mode": drop the window (Left Up)
+                # WHILE the modifier is still held, release it later.
+                self.super_sent = False
+                self.left_held = False  # We forced it up
+                self.release_pending = True
+                return COMMIT
+
+            # We never sent the modifier (left wasn't held when right started)
+            return ((etype, code, value),)
+
+        # Left not held, normal Right Click behavior.
+        # If the user released left before right, stop sending the modifier.
+        if self.super_sent:
+            if not right_held:
+                self.super_sent = False
+                return ((EV_KEY, self.modifier_key, 0),)
+            return NOTHING
+        return ((etype, code, value),)
+
+    def resync(self, left, right):
+        """Source events releasing buttons the state holds but the device no longer does.
+
+        For recovery after SYN_DROPPED: feed them through process() in order.
+        Left goes first, so with the real order unknown the window is dropped
+        where it is rather than snapped; a modifier only justified by a
+        lost right release goes with it. Lost presses are not replayed: a left
+        forced up by a commit would come back down as a new drag.
+        """
+        edges = []
+        if self.left_held and not left:
+            edges.append((EV_KEY, BTN_LEFT, 0))
+        if self.right_held and not right:
+            edges.append((EV_KEY, BTN_RIGHT, 0))
+        return edges
+
+    def release_modifier(self):
+        """Events finishing a commit; empty if a new swap took the modifier over."""
+        if not self.release_pending:
+            return NOTHING
+        self.release_pending = False
+        return ((EV_KEY, self.modifier_key, 0),)
@@ -35,6 +35,10 @@ echo "Installing daemon..."
 mkdir -p "$INSTALL_DIR"
 cp "$SCRIPT_DIR/super_activity_daemon.py" "$INSTALL_DIR/"
 chmod +x "$INSTALL_DIR/super_activity_daemon.py"
+# Modules shared with tiling-rightclick (repository root)
+for module in input_codes.py event_capture.py input_discovery.py daemon_log.py super_tap.py event_mask.py event_clock.py control_socket.py; do
+    cp "$SCRIPT_DIR/../$module" "$INSTALL_DIR/"
+done
 
 # Install configuration GUI
 echo "Installing configuration GUI..."
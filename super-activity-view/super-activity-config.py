@@ -14,6 +14,14 @@ import json
 import os
 import subprocess
 import sys
+from pathlib import Path
+
+# control_socket.py is installed next to this file; in a source checkout it
+# lives one directory up
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import control_socket
+from control_socket import ControlError
 
 CONFIG_PATH = "/etc/super-activity-view/config.json"
 SERVICE_NAME = "super-activity-view.service"
@@ -66,16 +74,23 @@ class SuperActivityConfig(Adw.Application):
                 return False
     
     def get_service_status(self):
-        """Get the current service status."""
+        """Whether the daemon is running (it answers on its control socket)."""
         try:
-            result = subprocess.run(
-                ['systemctl', 'is-active', SERVICE_NAME],
-                capture_output=True, text=True
-            )
-            return result.stdout.strip() == "active"
-        except Exception:
+            control_socket.request(control_socket.SUPER_SOCKET, "status")
+            return True
+        except (OSError, ControlError):
             return False
     
+    def apply_config(self):
+        """Save the config and have the running daemon re-read it."""
+        self.save_config()
+        try:
+            control_socket.request(control_socket.SUPER_SOCKET, "reload")
+            self.restart_notice.set_visible(False)
+        except (OSError, ControlError):
+            # Not running (it reads the file on start) or not allowed to ask
+            self.restart_notice.set_visible(self.get_service_status())
+    
     def control_service(self, action):
         """Start, stop, or restart the service."""
         try:
@@ -209,8 +224,7 @@ class SuperActivityConfig(Adw.Application):
             new_key = KEY_OPTIONS[key_names[idx]]
             if new_key != self.config.get("trigger_key"):
                 self.config["trigger_key"] = new_key
-                self.restart_notice.set_visible(True)
-                self.save_config()
+                self.apply_config()
     
     def on_injection_changed(self, row, param, key_names):
         """Handle injection key selection change."""
@@ -219,8 +233,7 @@ class SuperActivityConfig(Adw.Application):
             new_key = KEY_OPTIONS[key_names[idx]]
             if new_key != self.config.get("injection_key"):
                 self.config["injection_key"] = new_key
-                self.restart_notice.set_visible(True)
-                self.save_config()
+                self.apply_config()
     
     def on_service_action(self, action):
         """Handle service control button click."""
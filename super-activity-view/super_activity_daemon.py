@@ -7,11 +7,11 @@ Ignores SUPER+key combinations AND SUPER+scroll/click.
 Ignores Virtual Devices and known Proxy Devices to prevent conflicts.
 """
 
+import argparse
 import asyncio
 import json
 import os
 import sys
-import time
 from pathlib import Path
 
 try:
@@ -21,8 +21,23 @@ except ImportError:
     print("Error: evdev module not found. Install with: pip install evdev")
     sys.exit(1)
 
+# Modules shared with tiling-rightclick are installed next to this file;
+# in a source checkout they live one directory up.
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from event_capture import CaptureWriter
+from input_discovery import list_input_nodes
+from daemon_log import DaemonLog
+from super_tap import SuperTap, is_tap_source, INJECTOR_NAME, TAP_EVENTS, PRESSED, TAP, INTERRUPTED, INTERACTION
+from event_mask import mask_events, EventFilter
+from event_clock import use_monotonic_clock
+from control_socket import ControlServer, SUPER_SOCKET
+
 CONFIG_PATH = "/etc/super-activity-view/config.json"
 
+# Logging happens on a background thread; see daemon_log.py
+log = DaemonLog()
+
 # Key name to evdev code mapping
 KEY_MAP = {
     "KEY_LEFTMETA": ecodes.KEY_LEFTMETA,
@@ -32,35 +47,57 @@ KEY_MAP = {
 }
 
 
+class KeyName:
+    """Key code that is only turned into a name when its log line is written."""
+    
+    __slots__ = ("code",)
+    
+    def __init__(self, code):
+        self.code = code
+    
+    def __str__(self):
+        return str(ecodes.KEY.get(self.code) or ecodes.BTN.get(self.code) or f"CODE_{self.code}")
+
+
 class SuperActivityDaemon:
     """Daemon that monitors SUPER key, other keys, and mouse actions."""
     
-    # Maximum time (seconds) between press and release to be considered a "tap"
-    TAP_TIMEOUT = 0.5
-    
-    def __init__(self):
-        self.super_pressed = False
-        self.super_press_time = 0
-        self.other_key_pressed = False
+    def __init__(self, capture_path=None, inject=True):
         self.devices = []
         self.ui = None
+        self.capture_path = capture_path
+        self.capture = None
+        self.loop = None
+        self.stopped = None  # Future resolved when the last device disconnects
+        self.monitored = 0
+        self.trigger_task = None
+        self.filters = {}  # fd -> userspace EventFilter where the kernel cannot mask
+        self.paused = False  # Taps are detected but not injected (control socket)
+        self.taps = 0
+        self.suppressed = 0  # Taps while paused
+        self.control = None
         
         # Load configuration
         self.load_config()
         
+        # Replays run the detection logic without injecting anything
+        if not inject:
+            return
+        
         # Initialize Virtual Input Device
         try:
-            self.ui = UInput(name="Super Activity Daemon")
-            print("Virtual UInput device created successfully")
+            self.ui = UInput(name=INJECTOR_NAME)
+            log.info("Virtual UInput device created successfully")
         except Exception as e:
-            print(f"Failed to create UInput device: {e}")
-            print("Make sure you are running as root or have access to /dev/uinput")
+            log.error("Failed to create UInput device: %s", e)
+            log.error("Make sure you are running as root or have access to /dev/uinput")
     
     def load_config(self):
         """Load configuration from file."""
         # Default configuration
         trigger_key = "KEY_LEFTMETA"
         injection_key = "KEY_LEFTCTRL"
+        log_level = "info"
         
         try:
             if os.path.exists(CONFIG_PATH):
@@ -68,70 +105,80 @@ class SuperActivityDaemon:
                     config = json.load(f)
                     trigger_key = config.get("trigger_key", trigger_key)
                     injection_key = config.get("injection_key", injection_key)
-                    print(f"Loaded config: trigger={trigger_key}, injection={injection_key}")
+                    log_level = config.get("log_level", log_level)
+                    log.info("Loaded config: trigger=%s, injection=%s", trigger_key, injection_key)
         except (PermissionError, json.JSONDecodeError) as e:
-            print(f"Could not load config, using defaults: {e}")
+            log.warning("Could not load config, using defaults: %s", e)
+        
+        # "debug" also logs every SUPER press/release and interaction
+        log.set_level(log_level)
+        
+        self.config = {"trigger_key": trigger_key, "injection_key": injection_key, "log_level": log_level}
         
         # Convert key names to evdev codes
         self.SUPER_KEYS = {KEY_MAP.get(trigger_key, ecodes.KEY_LEFTMETA)}
         self.TRIGGER_KEYS = [KEY_MAP.get(injection_key, ecodes.KEY_LEFTCTRL)]
+        # Tap state (press time, other keys/scroll while held) is shared with the input hub
+        self.tap = SuperTap(self.SUPER_KEYS)
         
-        print(f"Listening for: {trigger_key}")
-        print(f"Will inject: {injection_key}")
+        log.info("Listening for: %s", trigger_key)
+        log.info("Will inject: %s", injection_key)
         
         
     def find_input_devices(self):
-        """Find keyboards and mice (filtering out virtual devices)."""
+        """Find keyboards and mice (filtering out virtual devices).
+        
+        Devices are classified from sysfs; only the ones we monitor get opened.
+        """
         input_devices = []
-        for path in evdev.list_devices():
+        for node in list_input_nodes():
+            # FILTER: Ignore our own device, the Tiling Shell Proxy (masquerades
+            # as USB) and BUS_VIRTUAL (0x06)
+            if not is_tap_source(node):
+                continue
+            
+            name = node.name
+            is_keyboard = node.is_keyboard
+            is_mouse = node.is_mouse
+            
             try:
-                device = evdev.InputDevice(path)
-                name = device.name
-                
-                # FILTER: Ignore our own device
-                if name == "Super Activity Daemon":
-                    continue
-
-                # FILTER: Ignore Tiling Shell Proxy (Masquerades as USB)
-                if "Tiling Shell Proxy Device" in name:
-                    # print(f"Ignoring Tiling Proxy: {name}")
-                    continue
-                
-                # FILTER: Ignore BUS_VIRTUAL (0x06)
-                if device.info.bustype == 0x06:
-                    # print(f"Ignoring virtual device: {name}")
-                    continue
-                    
-                caps = device.capabilities()
-                
-                # Check for Keyboard-like
-                is_keyboard = False
-                if ecodes.EV_KEY in caps:
-                    keys = caps[ecodes.EV_KEY]
-                    if ecodes.KEY_A in keys and ecodes.KEY_SPACE in keys:
-                        is_keyboard = True
-                
-                # Check for Mouse-like
-                is_mouse = False
-                if ecodes.EV_REL in caps:
-                     is_mouse = True
-                
-                if is_keyboard or is_mouse:
-                    input_devices.append(device)
-                    dtype = "Keyboard" if is_keyboard else "Mouse/Other"
-                    if is_keyboard and is_mouse: dtype = "Combo"
-                    print(f"Found {dtype}: {name} ({device.path})")
-                    
+                device = evdev.InputDevice(node.path)
             except (PermissionError, OSError):
-                pass
+                continue
+            try:
+                self.mask_device(device)
+                # Tap timing uses event timestamps; make them immune to wall-clock changes
+                if not use_monotonic_clock(device.fd):
+                    log.warning("%s: kernel timestamps stay on the wall clock", name)
+            except OSError as e:
+                # Typically ENODEV: a re-enumerating receiver's node already went away
+                log.warning("Could not set up %s (%s): %s", name, device.path, e)
+                self.filters.pop(device.fd, None)
+                device.close()
+                continue
+            input_devices.append(device)
+            dtype = "Keyboard" if is_keyboard else "Mouse/Other"
+            if is_keyboard and is_mouse: dtype = "Combo"
+            log.info("Found %s: %s (%s)", dtype, name, device.path)
         return input_devices
     
+    def mask_device(self, device):
+        """Have the kernel drop everything but keys and wheels (mouse motion never wakes us)."""
+        try:
+            masked = mask_events(device.fd, TAP_EVENTS)
+        except OSError as e:
+            log.warning("Could not set event mask on %s: %s", device.name, e)
+            masked = False
+        if not masked:
+            # Kernel without EVIOCSMASK: same filtering right after read()
+            self.filters[device.fd] = EventFilter(TAP_EVENTS)
+    
     async def trigger_activity_view(self):
         """Trigger GNOME Activity View."""
         if not self.ui:
             return
 
-        print("Triggering Activity View (Injecting logical Super)...")
+        log.debug("Triggering Activity View (Injecting logical Super)...")
         try:
             for key in self.TRIGGER_KEYS:
                 self.ui.write(ecodes.EV_KEY, key, 1)
@@ -141,92 +188,156 @@ class SuperActivityDaemon:
                 self.ui.write(ecodes.EV_KEY, key, 0)
             self.ui.syn()
         except OSError as e:
-            print(f"Failed to inject keys: {e}")
+            log.error("Failed to inject keys: %s", e)
     
-    async def handle_event(self, event):
-        """Handle a single input event."""
+    def handle_events(self, events):
+        """Run a read batch through the tap detector; True if it contained a clean tap.
         
-        # 1. Handle Key Events
-        if event.type == ecodes.EV_KEY:
-            key_code = event.code
-            key_state = event.value  # 0=release, 1=press, 2=repeat
-            
-            # Handle SUPER key events
-            if key_code in self.SUPER_KEYS:
-                if key_state == 1:  # Press
-                    self.super_pressed = True
-                    self.super_press_time = time.time()
-                    self.other_key_pressed = False
-                    print(f"SUPER pressed ({ecodes.KEY.get(key_code)}) - tracking started")
-                    
-                elif key_state == 0:  # Release
-                    if self.super_pressed:
-                        elapsed = time.time() - self.super_press_time
-                        
-                        if not self.other_key_pressed and elapsed < self.TAP_TIMEOUT:
-                            print(f"Clean SUPER tap detected ({elapsed:.3f}s)")
-                            await self.trigger_activity_view()
-                        else:
-                            cause = "other action" if self.other_key_pressed else "held too long"
-                            print(f"SUPER release ignored ({cause})")
-                        
-                        self.super_pressed = False
-                        self.other_key_pressed = False
-                        
-            # Handle OTHER keys while SUPER is held
-            elif self.super_pressed:
-                if key_state == 1: # On Press
-                    key_name = ecodes.KEY.get(key_code) or ecodes.BTN.get(key_code) or f"CODE_{key_code}"
-                    print(f"Interaction detected (Key/Btn): {key_name} - Activity View negated")
-                    self.other_key_pressed = True
-
-        # 2. Handle Relative Events (Mouse Scroll)
-        elif event.type == ecodes.EV_REL and self.super_pressed:
-            if event.code in [ecodes.REL_WHEEL, ecodes.REL_HWHEEL]:
-                if event.value != 0:
-                    print("Interaction detected (Scroll) - Activity View negated")
-                    self.other_key_pressed = True
+        Synchronous on purpose: motion and most key events change nothing and
+        never touch the event loop.
+        """
+        tap = self.tap
+        tapped = False
+        for event in events:
+            # Kernel timestamps: a backlog or a slow injection does not stretch or shrink the tap
+            result = tap.process(event.type, event.code, event.value, event.sec, event.usec)
+            if result is None:
+                continue
+            if result is PRESSED:
+                log.debug("SUPER pressed (%s) - tracking started", KeyName(event.code))
+            elif result is TAP:
+                log.debug("Clean SUPER tap detected (%.3fs)", tap.held)
+                self.taps += 1
+                tapped = True
+            elif result is INTERACTION:
+                if event.type == ecodes.EV_KEY:
+                    log.debug("Interaction detected (Key/Btn): %s - Activity View negated", KeyName(event.code))
+                else:
+                    log.debug("Interaction detected (Scroll) - Activity View negated")
+            else:
+                log.debug("SUPER release ignored (%s)",
+                          "other action" if result is INTERRUPTED else "held too long")
+        return tapped
+    
+    def on_readable(self, device, device_id):
+        """Drain everything the device has queued (called by the event loop)."""
+        try:
+            events = device.read()
+            event_filter = self.filters.get(device.fd)
+            if event_filter:
+                events = event_filter(events)
+            if self.capture:
+                events = self.capture.record(device_id, events)
+            if self.handle_events(events):
+                if self.paused:
+                    self.suppressed += 1
+                    return
+                # Only a tap needs the event loop (the injection sleeps between press and release)
+                self.trigger_task = self.loop.create_task(self.trigger_activity_view())
+        except BlockingIOError:
+            pass
+        except OSError as e:
+            log.warning("Device %s disconnected: %s", device.name, e)
+            self.loop.remove_reader(device.fd)
+            self.monitored -= 1
+            if not self.monitored and not self.stopped.done():
+                self.stopped.set_result(None)
     
-    async def monitor_device(self, device):
-        """Monitor a single device for events."""
+    def start_control(self):
+        """Serve status, stats and pause/resume on the control socket (see control_socket.py)."""
+        self.control = ControlServer(SUPER_SOCKET, {
+            "status": lambda request: {
+                "service": "super-activity-view",
+                "pid": os.getpid(),
+                "uptime": self.control.uptime(),
+                "paused": self.paused,
+                "devices": self.monitored,
+            },
+            "devices": lambda request: {"devices": [
+                {"path": device.path, "name": device.name, "masked": device.fd not in self.filters}
+                for device in self.devices]},
+            "stats": lambda request: {"taps": self.taps, "suppressed": self.suppressed},
+            "config": lambda request: {"config": self.config},
+            "reload": self.reload_config,
+            "pause": lambda request: self.set_paused(True),
+            "resume": lambda request: self.set_paused(False),
+        }, log)
         try:
-            async for event in device.async_read_loop():
-                await self.handle_event(event)
+            self.control.start(self.loop.add_reader, self.loop.remove_reader)
         except OSError as e:
-            print(f"Device {device.name} disconnected: {e}")
+            log.warning("No control socket at %s: %s", SUPER_SOCKET, e)
+    
+    def reload_config(self, request):
+        log.info("Reloading %s", CONFIG_PATH)
+        self.load_config()
+        return {"config": self.config}
+    
+    def set_paused(self, paused):
+        if paused != self.paused:
+            self.paused = paused
+            log.info("%s", "Paused: taps are not injected" if paused else "Resumed")
+        return {"paused": paused}
     
     async def run(self):
         """Main run loop."""
-        print("Super Activity View Daemon starting (Filtered Proxy Devices)...")
+        log.info("Super Activity View Daemon starting (Filtered Proxy Devices)...")
         self.devices = self.find_input_devices()
         
         if not self.devices:
-            print("No input devices found!")
+            log.error("No input devices found!")
             sys.exit(1)
         
-        tasks = [self.monitor_device(device) for device in self.devices]
+        if self.filters:
+            log.warning("Kernel event masks unavailable for %d device(s); filtering in userspace",
+                        len(self.filters))
+        
+        if self.capture_path:
+            self.capture = CaptureWriter(self.capture_path)
+            for device_id, device in enumerate(self.devices):
+                log.info("Capturing device %d: %s (%s)", device_id, device.name, device.path)
+            log.info("Capturing events to %s", self.capture_path)
+        
+        # Readiness callbacks read whole batches; runs until every device is gone
+        self.loop = asyncio.get_running_loop()
+        self.stopped = self.loop.create_future()
+        for device_id, device in enumerate(self.devices):
+            self.loop.add_reader(device.fd, self.on_readable, device, device_id)
+        self.monitored = len(self.devices)
+        self.start_control()
         
         try:
-            await asyncio.gather(*tasks)
+            await self.stopped
         except asyncio.CancelledError:
-            print("Shutting down...")
+            log.info("Shutting down...")
         finally:
+            self.control.close()
+            for device in self.devices:
+                self.loop.remove_reader(device.fd)
             if self.ui:
                 self.ui.close()
+            if self.capture:
+                self.capture.close()
+                log.info("Captured %d events", self.capture.count)
             for device in self.devices:
                 try:
                     device.close()
                 except:
                     pass
+            log.close()
 
 def main():
-    daemon = SuperActivityDaemon()
+    parser = argparse.ArgumentParser(description="Super key Activity View daemon")
+    parser.add_argument("--capture", metavar="FILE",
+                        help="record every input event to FILE (replay with tools/replay_capture.py)")
+    args = parser.parse_args()
+    
+    daemon = SuperActivityDaemon(capture_path=args.capture)
     try:
         asyncio.run(daemon.run())
     except KeyboardInterrupt:
         pass
     except PermissionError:
-        print("Permission denied. Run with sudo.")
+        log.error("Permission denied. Run with sudo.")
         sys.exit(1)
 
 if __name__ == "__main__":
@@ -0,0 +1,85 @@
+"""
+SUPER tap detection shared by super_activity_daemon.py and the input hub.
+
+SuperTap is a pure state machine: feed it source events with their kernel
+timestamps and it reports when a clean tap of a trigger key (press and
+release with nothing else in between, within TAP_TIMEOUT) happened. Taps
+are timed from the timestamps only, so events that queue up behind a busy
+process are judged by when they happened, not when they were read. It does
+no I/O, so both daemons and the tools drive the same logic.
+"""
+
+from input_codes import EV_KEY, EV_REL, REL_WHEEL, REL_HWHEEL
+
+# Maximum time (seconds) between press and release to be considered a "tap"
+TAP_TIMEOUT = 0.5
+
+# Devices the detector never reads: its own injector and the right-click proxy
+INJECTOR_NAME = "Super Activity Daemon"
+PROXY_NAME = "Tiling Shell Proxy Device"
+
+# The only events process() looks at: every key and button, and the wheels
+TAP_EVENTS = {EV_KEY: None, EV_REL: (REL_WHEEL, REL_HWHEEL)}
+
+# process() results
+PRESSED = "pressed"  # Trigger key went down, tracking started
+TAP = "tap"  # Clean tap; open the Activity View
+HELD = "held"  # Released, but held too long
+INTERRUPTED = "interrupted"  # Released after another key, click or scroll
+INTERACTION = "interaction"  # Another key, click or scroll while the trigger is held
+
+
+def is_tap_source(node):
+    """Whether the detector should read this device (physical keyboards and mice)."""
+    if node.name == INJECTOR_NAME or PROXY_NAME in node.name:
+        return False
+    if node.is_virtual:
+        return False
+    return node.is_keyboard or node.is_mouse
+
+
+class SuperTap:
+    """Tracks one trigger key across all devices and reports clean taps."""
+
+    __slots__ = ("super_keys", "tap_timeout", "pressed", "press_time", "held", "interrupted")
+
+    def __init__(self, super_keys, tap_timeout=TAP_TIMEOUT):
+        self.super_keys = frozenset(super_keys)
+        self.tap_timeout = tap_timeout
+        self.pressed = False
+        self.press_time = 0
+        self.held = 0  # Duration of the last press, in seconds
+        self.interrupted = False
+
+    def process(self, etype, code, value, sec, usec):
+        """Return one of the result constants for an event, or None.
+
+        sec/usec is the event's kernel timestamp (input_event.time).
+        """
+        if etype == EV_KEY:
+            if code in self.super_keys:
+                if value == 1:  # Press
+                    self.pressed = True
+                    self.press_time = sec + usec / 1e6
+                    self.interrupted = False
+                    return PRESSED
+                if value == 0 and self.pressed:  # Release
+                    interrupted = self.interrupted
+                    self.held = sec + usec / 1e6 - self.press_time
+                    self.pressed = False
+                    self.interrupted = False
+                    if interrupted:
+                        return INTERRUPTED
+                    if self.held >= self.tap_timeout:
+                        return HELD
+                    return TAP
+            elif self.pressed and value == 1 and not self.interrupted:
+                self.interrupted = True
+                return INTERACTION
+
+        elif etype == EV_REL and self.pressed and not self.interrupted:
+            if code in (REL_WHEEL, REL_HWHEEL) and value != 0:
+                self.interrupted = True
+                return INTERACTION
+
+        return None
@@ -14,18 +14,23 @@ import json
 import os
 import subprocess
 import sys
+import threading
 
-# Try to import evdev for device listing
-try:
-    import evdev
-    from evdev import ecodes
-    EVDEV_AVAILABLE = True
-except ImportError:
-    EVDEV_AVAILABLE = False
+# Devices are listed from sysfs, so no input node has to be opened
+from input_discovery import list_input_nodes
+# Status and pause/resume come from the daemon itself, not from systemctl
+import control_socket
+from control_socket import ControlError
 
 CONFIG_PATH = "/etc/tiling-rightclick/config.json"
 SERVICE_NAME = "tiling-rightclick.service"
 
+# Last seen mouse list, shown while the first scan runs
+DEVICE_LIST_CACHE = os.path.join(GLib.get_user_cache_dir(), "tiling-rightclick", "mice.json")
+
+# Hotplug bursts (a receiver re-enumerating) are collapsed into one rescan
+RESCAN_DELAY_MS = 300
+
 # Modifier key options
 MODIFIER_KEYS = {
     "Super (Left)": "KEY_LEFTMETA",
@@ -36,6 +41,16 @@ MODIFIER_KEYS = {
     "Alt (Right)": "KEY_RIGHTALT",
 }
 
+def list_mouse_names():
+    """Names of the mice the daemon could grab (runs on a worker thread)."""
+    names = []
+    for node in list_input_nodes():
+        # Check for relative movement (mouse), skip virtual/proxy devices
+        if node.is_mouse and "Tiling Shell Proxy" not in node.name and node.name not in names:
+            names.append(node.name)
+    return names
+
+
 class TilingRightclickConfig(Adw.Application):
     def __init__(self):
         super().__init__(
@@ -48,6 +63,14 @@ class TilingRightclickConfig(Adw.Application):
             "show_indicator": True
         }
         self.load_config()
+        self.mouse_names = self.load_device_cache()
+        self.devices = []
+        self.device_row = None
+        self.updating_devices = False  # Ignore selection changes we make ourselves
+        self.scan_running = False
+        self.scan_pending = False
+        self.rescan_source = None
+        self.input_monitor = None
         
     def load_config(self):
         """Load configuration from file."""
@@ -78,39 +101,111 @@ class TilingRightclickConfig(Adw.Application):
             except subprocess.CalledProcessError:
                 return False
     
+    def load_device_cache(self):
+        """Mouse names from the last scan, or an empty list."""
+        try:
+            with open(DEVICE_LIST_CACHE, 'r') as f:
+                names = json.load(f)
+            if isinstance(names, list):
+                return [name for name in names if isinstance(name, str)]
+        except (OSError, ValueError):
+            pass
+        return []
+    
+    def save_device_cache(self):
+        try:
+            os.makedirs(os.path.dirname(DEVICE_LIST_CACHE), exist_ok=True)
+            with open(DEVICE_LIST_CACHE, 'w') as f:
+                json.dump(self.mouse_names, f)
+        except OSError as e:
+            print(f"Could not write device cache: {e}")
+    
     def get_mouse_devices(self):
-        """Get list of available mouse devices."""
+        """Get list of available mouse devices (from the last scan)."""
         devices = [("(All Devices)", "")]
-        if not EVDEV_AVAILABLE:
-            return devices
-        
+        for name in self.mouse_names:
+            devices.append((name, name))
+        # Keep a configured mouse selectable while it is unplugged
+        configured = self.config.get("device_name", "")
+        if configured and configured not in self.mouse_names:
+            devices.append((f"{configured} (not connected)", configured))
+        return devices
+    
+    def start_device_scan(self):
+        """Enumerate mice on a worker thread; the list updates when it finishes."""
+        if self.scan_running:
+            self.scan_pending = True
+            return
+        self.scan_running = True
+        threading.Thread(target=self.scan_devices, daemon=True).start()
+    
+    def scan_devices(self):
+        """Worker thread: never touches GTK, results go back through idle_add."""
         try:
-            for path in evdev.list_devices():
-                try:
-                    dev = evdev.InputDevice(path)
-                    caps = dev.capabilities()
-                    # Check for relative movement (mouse)
-                    if evdev.ecodes.EV_REL in caps:
-                        # Skip virtual/proxy devices
-                        if "Tiling Shell Proxy" not in dev.name:
-                            devices.append((dev.name, dev.name))
-                except (PermissionError, OSError):
-                    pass
+            names = list_mouse_names()
         except Exception as e:
             print(f"Error listing devices: {e}")
-        
-        return devices
+            names = None
+        GLib.idle_add(self.on_devices_scanned, names)
+    
+    def on_devices_scanned(self, names):
+        self.scan_running = False
+        if names is not None and names != self.mouse_names:
+            self.mouse_names = names
+            self.save_device_cache()
+            self.update_device_model()
+        if self.scan_pending:
+            self.scan_pending = False
+            self.start_device_scan()
+        return False
+    
+    def update_device_model(self):
+        """Rebuild the device dropdown, keeping the configured device selected."""
+        self.devices = self.get_mouse_devices()
+        if not self.device_row:
+            return
+        device_model = Gtk.StringList()
+        selected_idx = 0
+        for i, (name, value) in enumerate(self.devices):
+            device_model.append(name)
+            if value == self.config.get("device_name", ""):
+                selected_idx = i
+        self.updating_devices = True
+        self.device_row.set_model(device_model)
+        self.device_row.set_selected(selected_idx)
+        self.updating_devices = False
+    
+    def watch_devices(self):
+        """Rescan when event nodes appear in or disappear from /dev/input."""
+        try:
+            self.input_monitor = Gio.File.new_for_path("/dev/input").monitor_directory(
+                Gio.FileMonitorFlags.NONE, None)
+        except GLib.Error as e:
+            print(f"Not watching /dev/input: {e.message}")
+            return
+        self.input_monitor.connect("changed", self.on_input_dir_changed)
+    
+    def on_input_dir_changed(self, monitor, file, other_file, event):
+        if not file.get_basename().startswith("event"):
+            return
+        if event not in (Gio.FileMonitorEvent.CREATED, Gio.FileMonitorEvent.DELETED,
+                         Gio.FileMonitorEvent.ATTRIBUTE_CHANGED):
+            return
+        if self.rescan_source:
+            GLib.source_remove(self.rescan_source)
+        self.rescan_source = GLib.timeout_add(RESCAN_DELAY_MS, self.on_rescan_timeout)
+    
+    def on_rescan_timeout(self):
+        self.rescan_source = None
+        self.start_device_scan()
+        return False
     
     def get_service_status(self):
-        """Get the current service status."""
+        """The daemon's status reply, or None if it is not running."""
         try:
-            result = subprocess.run(
-                ['systemctl', 'is-active', SERVICE_NAME],
-                capture_output=True, text=True
-            )
-            return result.stdout.strip() == "active"
-        except Exception:
-            return False
+            return control_socket.request(control_socket.PROXY_SOCKET, "status")
+        except (OSError, ControlError):
+            return None
     
     def control_service(self, action):
         """Start, stop, or restart the service."""
@@ -159,21 +254,13 @@ class TilingRightclickConfig(Adw.Application):
         device_row = Adw.ComboRow()
         device_row.set_title("Device")
         
-        # Populate device list
-        devices = self.get_mouse_devices()
-        device_model = Gtk.StringList()
-        selected_idx = 0
-        for i, (name, value) in enumerate(devices):
-            device_model.append(name)
-            if value == self.config.get("device_name", ""):
-                selected_idx = i
-        
-        device_row.set_model(device_model)
-        device_row.set_selected(selected_idx)
-        device_row.connect("notify::selected", self.on_device_changed, devices)
-        device_group.add(device_row)
+        # Populate device list from the cache; the scan fills in the rest
         self.device_row = device_row
-        self.devices = devices
+        self.update_device_model()
+        device_row.connect("notify::selected", self.on_device_changed)
+        device_group.add(device_row)
+        self.start_device_scan()
+        self.watch_devices()
         
         # Refresh button
         refresh_row = Adw.ActionRow()
@@ -211,13 +298,6 @@ class TilingRightclickConfig(Adw.Application):
         self.key_row = key_row
         self.key_names = key_names
         
-        # Restart notice (hidden by default)
-        self.restart_notice = Adw.ActionRow()
-        self.restart_notice.set_title("⚠️ Restart Required")
-        self.restart_notice.set_subtitle("Click Restart below to apply the new modifier key")
-        self.restart_notice.set_visible(False)
-        key_group.add(self.restart_notice)
-        
         # === Service Control Group ===
         service_group = Adw.PreferencesGroup()
         service_group.set_title("Service Control")
@@ -226,7 +306,6 @@ class TilingRightclickConfig(Adw.Application):
         # Status row
         self.status_row = Adw.ActionRow()
         self.status_row.set_title("Service Status")
-        self.update_status_display()
         service_group.add(self.status_row)
         
         # Control buttons row
@@ -248,8 +327,13 @@ class TilingRightclickConfig(Adw.Application):
         restart_btn.connect("clicked", lambda b: self.on_service_action("restart"))
         control_box.append(restart_btn)
         
+        self.pause_btn = Gtk.Button(label="Pause")
+        self.pause_btn.connect("clicked", self.on_pause_clicked)
+        control_box.append(self.pause_btn)
+        
         control_row.add_suffix(control_box)
         service_group.add(control_row)
+        self.update_status_display()
         
         # === Indicator Settings Group ===
         indicator_group = Adw.PreferencesGroup()
@@ -268,11 +352,13 @@ class TilingRightclickConfig(Adw.Application):
         
         win.present()
     
-    def on_device_changed(self, row, param, devices):
+    def on_device_changed(self, row, param):
         """Handle device selection change."""
+        if self.updating_devices:
+            return
         idx = row.get_selected()
-        if idx < len(devices):
-            self.config["device_name"] = devices[idx][1]
+        if idx < len(self.devices):
+            self.config["device_name"] = self.devices[idx][1]
     
     def on_key_changed(self, row, param, key_names):
         """Handle modifier key selection change."""
@@ -281,18 +367,12 @@ class TilingRightclickConfig(Adw.Application):
             new_key = MODIFIER_KEYS[key_names[idx]]
             if new_key != self.config.get("modifier_key"):
                 self.config["modifier_key"] = new_key
-                self.restart_notice.set_visible(True)
-                # Auto-save when modifier changes
+                # Auto-save when modifier changes; the running daemon picks it up
                 self.save_config()
     
     def on_refresh_clicked(self, button):
         """Refresh the device list."""
-        self.devices = self.get_mouse_devices()
-        device_model = Gtk.StringList()
-        for name, _ in self.devices:
-            device_model.append(name)
-        self.device_row.set_model(device_model)
-        self.device_row.set_selected(0)
+        self.start_device_scan()
     
     def on_indicator_toggled(self, row, param):
         """Handle indicator toggle change."""
@@ -354,15 +434,33 @@ class TilingRightclickConfig(Adw.Application):
         """Handle service control button click."""
         if self.control_service(action):
             GLib.timeout_add(500, self.update_status_display)
-            if action == "restart":
-                self.restart_notice.set_visible(False)
         else:
             self.show_message("Error", f"Failed to {action} service")
     
+    def on_pause_clicked(self, button):
+        """Release or re-grab the mice without stopping the service."""
+        status = self.get_service_status()
+        if not status:
+            return
+        try:
+            control_socket.request(control_socket.PROXY_SOCKET,
+                                   "resume" if status.get("paused") else "pause")
+        except (OSError, ControlError) as e:
+            self.show_message("Error", f"Could not pause/resume: {e}")
+        self.update_status_display()
+    
     def update_status_display(self):
         """Update the service status display."""
-        is_active = self.get_service_status()
-        status_text = "Running" if is_active else "Stopped"
+        status = self.get_service_status()
+        is_active = status is not None and not status.get("paused")
+        if status is None:
+            status_text = "Stopped"
+        elif status.get("paused"):
+            status_text = "Paused"
+        else:
+            status_text = f"Running ({status.get('grabbed', 0)} mice)"
+        self.pause_btn.set_label("Resume" if status and status.get("paused") else "Pause")
+        self.pause_btn.set_sensitive(status is not None)
         
         # Update existing label if we have one, otherwise create it
         if hasattr(self, 'status_label') and self.status_label:
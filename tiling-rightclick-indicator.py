@@ -5,22 +5,45 @@ Tiling Rightclick System Tray Indicator
 Lives in the Ubuntu/GNOME top bar and provides quick access to:
 - Service status
 - Start/Stop toggle
+- Pause/Resume grabbing
 - Open configuration GUI
+
+Service status comes from systemd's PropertiesChanged signals on the
+system bus, so nothing is polled. Point DBUS_SYSTEM_BUS_ADDRESS at a
+private bus running tools/mock_systemd.py to try it without systemd.
+Whether grabbing is paused is asked from the daemon's control socket.
 """
 
 import gi
 gi.require_version('Gtk', '3.0')
 gi.require_version('AppIndicator3', '0.1')
-from gi.repository import Gtk, AppIndicator3, GLib
+from gi.repository import Gtk, AppIndicator3, GLib, Gio
 import subprocess
 import os
 import signal
 import json
 
+import control_socket
+from control_socket import ControlError
+
 SERVICE_NAME = "tiling-rightclick.service"
 CONFIG_GUI_PATH = "/opt/tiling-rightclick/tiling-rightclick-config.py"
 CONFIG_PATH = "/etc/tiling-rightclick/config.json"
 
+SYSTEMD_BUS_NAME = "org.freedesktop.systemd1"
+SYSTEMD_PATH = "/org/freedesktop/systemd1"
+SYSTEMD_MANAGER = "org.freedesktop.systemd1.Manager"
+SYSTEMD_UNIT = "org.freedesktop.systemd1.Unit"
+
+# Status line, toggle label and icon per systemd ActiveState
+STATES = {
+    "active": ("● Service Running", "Stop Service", "input-mouse"),
+    "activating": ("◌ Service Starting...", "Stop Service", "input-mouse"),
+    "deactivating": ("◌ Service Stopping...", "Start Service", "input-mouse-symbolic"),
+}
+STOPPED = ("○ Service Stopped", "Start Service", "input-mouse-symbolic")
+PAUSED = ("‖ Grabbing Paused", "Stop Service", "input-mouse-symbolic")
+
 def should_show_indicator():
     """Check config to see if indicator should be shown."""
     try:
@@ -32,6 +55,48 @@ def should_show_indicator():
         pass
     return True  # Default to showing
 
+class ServiceWatch:
+    """ActiveState of a systemd unit, kept current by D-Bus signals."""
+    
+    def __init__(self, unit_name, on_change):
+        self.unit_name = unit_name
+        self.on_change = on_change
+        bus = Gio.bus_get_sync(Gio.BusType.SYSTEM, None)
+        self.manager = Gio.DBusProxy.new_sync(
+            bus, Gio.DBusProxyFlags.DO_NOT_LOAD_PROPERTIES | Gio.DBusProxyFlags.DO_NOT_CONNECT_SIGNALS,
+            None, SYSTEMD_BUS_NAME, SYSTEMD_PATH, SYSTEMD_MANAGER, None)
+        self.subscribe()
+        # LoadUnit (unlike GetUnit) also works while the unit is stopped and unloaded
+        path, = self.manager.call_sync("LoadUnit", GLib.Variant("(s)", (unit_name,)),
+                                       Gio.DBusCallFlags.NONE, -1, None).unpack()
+        # The proxy caches the unit's properties and applies PropertiesChanged to them
+        self.unit = Gio.DBusProxy.new_sync(bus, Gio.DBusProxyFlags.NONE, None,
+                                           SYSTEMD_BUS_NAME, path, SYSTEMD_UNIT, None)
+        self.unit.connect("g-properties-changed", self.on_properties_changed)
+        # systemd forgets subscriptions when it re-executes
+        self.manager.connect("notify::g-name-owner", self.on_owner_changed)
+    
+    def subscribe(self):
+        """Unit signals are only sent while some client is subscribed."""
+        self.manager.call_sync("Subscribe", None, Gio.DBusCallFlags.NONE, -1, None)
+    
+    def active_state(self):
+        value = self.unit.get_cached_property("ActiveState")
+        return value.unpack() if value is not None else "unknown"
+    
+    def on_properties_changed(self, proxy, changed, invalidated):
+        if "ActiveState" in changed.unpack() or "ActiveState" in invalidated:
+            self.on_change()
+    
+    def on_owner_changed(self, proxy, param):
+        if proxy.get_name_owner():
+            try:
+                self.subscribe()
+            except GLib.Error as e:
+                print(f"Could not resubscribe to systemd: {e.message}")
+            self.on_change()
+
+
 class TilingRightclickIndicator:
     def __init__(self):
         # Create the indicator
@@ -58,43 +123,66 @@ class TilingRightclickIndicator:
         self.toggle_item.connect("activate", self.on_toggle_service)
         self.menu.append(self.toggle_item)
         
+        # Pause/resume grabbing (the service keeps running)
+        self.pause_item = Gtk.MenuItem(label="Pause Grabbing")
+        self.pause_item.connect("activate", self.on_toggle_pause)
+        self.menu.append(self.pause_item)
+        
         # Open config item
         config_item = Gtk.MenuItem(label="Open Configuration...")
         config_item.connect("activate", self.on_open_config)
         self.menu.append(config_item)
         
         self.menu.show_all()
+        # Someone else (the config GUI) may have paused it since the last update
+        self.menu.connect("show", lambda menu: self.update_status())
         self.indicator.set_menu(self.menu)
         
-        # Update status periodically
+        # Follow the service over D-Bus; poll only if the system bus is unusable
+        try:
+            self.service = ServiceWatch(SERVICE_NAME, self.update_status)
+        except GLib.Error as e:
+            print(f"D-Bus unavailable, polling the control socket instead: {e.message}")
+            self.service = None
         self.update_status()
-        GLib.timeout_add_seconds(5, self.update_status)
+        if not self.service:
+            GLib.timeout_add_seconds(5, self.update_status)
+    
+    def get_daemon_status(self):
+        """The daemon's status reply, or None if it does not answer."""
+        try:
+            return control_socket.request(control_socket.PROXY_SOCKET, "status")
+        except (OSError, ControlError):
+            return None
+    
+    def get_active_state(self):
+        """systemd ActiveState of the service ("active", "inactive", ...)."""
+        if self.service:
+            return self.service.active_state()
+        # Without D-Bus, a daemon that answers is a running one
+        return "active" if self.get_daemon_status() else "inactive"
     
     def get_service_status(self):
         """Check if the service is running."""
-        try:
-            result = subprocess.run(
-                ['systemctl', 'is-active', SERVICE_NAME],
-                capture_output=True, text=True
-            )
-            return result.stdout.strip() == "active"
-        except Exception:
-            return False
+        return self.get_active_state() in ("active", "activating")
     
     def update_status(self):
         """Update the status display."""
-        is_active = self.get_service_status()
+        state = self.get_active_state()
+        daemon = self.get_daemon_status() if state == "active" else None
+        paused = bool(daemon and daemon.get("paused"))
+        status, toggle, icon = PAUSED if paused else STATES.get(state, STOPPED)
+        self.pause_item.set_label("Resume Grabbing" if paused else "Pause Grabbing")
+        self.pause_item.set_sensitive(daemon is not None)
+        self.status_item.set_label(status)
+        self.toggle_item.set_label(toggle)
+        self.indicator.set_icon(icon)
         
-        if is_active:
-            self.status_item.set_label("● Service Running")
-            self.toggle_item.set_label("Stop Service")
-            self.indicator.set_icon("input-mouse")
-        else:
-            self.status_item.set_label("○ Service Stopped")
-            self.toggle_item.set_label("Start Service")
-            self.indicator.set_icon("input-mouse-symbolic")
-        
-        return True  # Continue timer
+        return True  # Continue timer (polling fallback)
+    
+    def refresh_once(self):
+        self.update_status()
+        return False
     
     def on_toggle_service(self, widget):
         """Toggle the service on/off."""
@@ -106,11 +194,24 @@ class TilingRightclickIndicator:
                 ['pkexec', 'systemctl', action, SERVICE_NAME],
                 check=True
             )
-            # Update status after action
-            GLib.timeout_add(500, self.update_status)
+            # With D-Bus the state change arrives as a signal
+            if not self.service:
+                GLib.timeout_add(500, self.refresh_once)
         except subprocess.CalledProcessError:
             pass
     
+    def on_toggle_pause(self, widget):
+        """Release or re-grab the mice without stopping the service."""
+        daemon = self.get_daemon_status()
+        if not daemon:
+            return
+        try:
+            control_socket.request(control_socket.PROXY_SOCKET,
+                                   "resume" if daemon.get("paused") else "pause")
+        except (OSError, ControlError) as e:
+            print(f"Could not pause/resume: {e}")
+        self.update_status()
+    
     def on_open_config(self, widget):
         """Open the configuration GUI."""
         try:
@@ -6,196 +6,946 @@ Intercepts mouse events using exclusive GRAB.
 Passes through all events to a virtual mouse, EXCEPT:
 - When dragging (Left Click held), Right Click is converted to SUPER key.
 - This prevents the OS from seeing the original Right Click (which cancels drags).
+
+With "super_tap" enabled the same process also runs the SUPER tap detector
+from super-activity-view, reading every physical device only once.
 """
 
-import evdev
 from evdev import UInput, ecodes as e
-import selectors
+import argparse
+import signal
 import sys
 import os
-import time
 import json
+import time
+
+from frame_forwarder import FrameForwarder
+from raw_output import RawOutput
+from raw_input import EVENT, EVENT_SIZE, RawEvent, count_reports, decode, last_event
+from rightclick_gesture import RightClickGesture, COMMIT, DISPATCH, FLUSH, GESTURE, DROPPED
+from motion_coalesce import coalesce, MAX_BACKLOG_NS
+from latency_trace import LatencyTracer
+from input_hub import InputHub, GRAB, READ
+from device_watch import DeviceWatcher, IN_CLOSE_WRITE, IN_MOVED_TO
+from daemon_log import DaemonLog
+from super_tap import SuperTap, is_tap_source, INJECTOR_NAME, TAP
+from control_socket import ControlServer, ControlError, PROXY_SOCKET
+from realtime import tune
 
 CONFIG_PATH = "/etc/tiling-rightclick/config.json"
+SUPER_CONFIG_PATH = "/etc/super-activity-view/config.json"
+PROXY_NAME = "Tiling Shell Proxy Device"
+KEYBOARD_NAME = f"{PROXY_NAME} Keyboard"
+
+# Logging happens on a background thread; see daemon_log.py
+log = DaemonLog()
 
-def load_config():
-    """Load configuration from file."""
+# How long an injected Activity View key stays down
+INJECT_HOLD = 0.05
+
+# Editors write the config in several steps; reload once they are done
+RELOAD_DELAY = 0.2
+# A modifier or device filter change waits this long for a gesture in progress to finish
+GESTURE_RETRY_DELAY = 0.1
+
+# Settings that only take effect on a service restart
+RESTART_KEYS = ("per_device_outputs", "super_tap", "trace_latency", "raw_output", "raw_input",
+                "realtime_priority", "sched_policy", "cpu_affinity", "lock_memory", "gc_tuning")
+
+def load_config(strict=False):
+    """Load configuration from file.
+
+    With strict, an unreadable or invalid file (including a value of the
+    wrong type) returns None instead of the defaults (a reload must not
+    reset or crash a running daemon). Otherwise a wrongly typed value is
+    replaced by its default.
+    """
     config = {
         "device_name": "",  # Empty means all devices
-        "modifier_key": "KEY_LEFTMETA"
+        "modifier_key": "KEY_LEFTMETA",
+        "commit_delay_ms": 50,  # Time Tiling Shell gets to process the drop
+        "coalesce_backlog_ms": 0,  # Merge queued motion frames older than this; 0 is off
+        "trace_latency": False,  # Per-event latency histograms (dumped on SIGUSR1/exit)
+        "per_device_outputs": False,  # One mirrored proxy device per grabbed mouse
+        "super_tap": False,  # Also run the SUPER tap detector (replaces super-activity-view)
+        "raw_output": True,  # One write(2) per frame to uinput instead of one per event
+        "raw_input": True,  # Read devices into a reused buffer instead of InputEvent objects
+        "log_level": "info",  # "debug" also logs every swap and snap commit
+        # Latency tuning under CPU contention, all off by default (see realtime.py)
+        "realtime_priority": 0,  # 1-99: SCHED_FIFO (or "sched_policy": "rr")
+        "sched_policy": "fifo",
+        "cpu_affinity": [],  # CPUs the event loop may run on
+        "lock_memory": False,  # mlockall()
+        "gc_tuning": False  # Freeze startup objects, no full collections on the event path
     }
     try:
         if os.path.exists(CONFIG_PATH):
             with open(CONFIG_PATH, 'r') as f:
+                loaded = json.load(f)
+            if not isinstance(loaded, dict):
+                raise ValueError("not a JSON object")
+            for key, value in loaded.items():
+                if key in config and not same_type(value, config[key]):
+                    if strict:
+                        raise ValueError(f"{key}: expected {type(config[key]).__name__}, got {value!r}")
+                    log.warning("Config: ignoring %s=%r, using %r", key, value, config[key])
+                    continue
+                config[key] = value
+    except (PermissionError, ValueError) as e:
+        if strict:
+            log.warning("Could not load config, keeping the current one: %s", e)
+            return None
+        log.warning("Could not load config, using defaults: %s", e)
+    return config
+
+def same_type(value, default):
+    """Whether a config value has the type of its default (ints and floats mix, bools do not)."""
+    if isinstance(default, bool) or isinstance(value, bool):
+        return isinstance(value, bool) and isinstance(default, bool)
+    if isinstance(default, (int, float)):
+        return isinstance(value, (int, float))
+    return isinstance(value, type(default))
+
+def is_mouse(node, device_filter=""):
+    """Check whether node supports relative movement and matches the filter."""
+    # Never proxy our own output devices
+    if node.name.startswith(PROXY_NAME):
+        return False
+    # If filter is set, only include matching device
+    if device_filter and device_filter not in node.name:
+        return False
+    return node.is_mouse
+
+def load_super_config():
+    """Trigger and injection keys from the super-activity-view configuration."""
+    config = {
+        "trigger_key": "KEY_LEFTMETA",
+        "injection_key": "KEY_LEFTCTRL"
+    }
+    try:
+        if os.path.exists(SUPER_CONFIG_PATH):
+            with open(SUPER_CONFIG_PATH, 'r') as f:
                 config.update(json.load(f))
     except (PermissionError, json.JSONDecodeError) as e:
-        print(f"Could not load config, using defaults: {e}")
+        log.warning("Could not load %s, using defaults: %s", SUPER_CONFIG_PATH, e)
     return config
 
-def find_mouse_devices(device_filter=""):
-    """Find all mouse devices that support relative movement."""
-    devices = []
-    for path in evdev.list_devices():
-        try:
-            dev = evdev.InputDevice(path)
-            caps = dev.capabilities()
-            if e.EV_REL in caps:
-                # If filter is set, only include matching device
-                if device_filter and device_filter not in dev.name:
-                    continue
-                devices.append(dev)
-        except (PermissionError, OSError):
-            pass
-    return devices
+def union_capabilities(devices):
+    """Union of the devices' capabilities, and the input properties they share.
 
+    Returns ({type: {code: absinfo or None}}, set of props). EV_SYN is
+    implicit, EV_FF needs effect uploads a proxy cannot forward, and EV_REP
+    would make the kernel auto-repeat keys whose repeats we already pass
+    through, so those types are left out.
+
+    Properties describe the whole device, so only those every device has
+    are kept: a TrackPoint's INPUT_PROP_POINTING_STICK would make libinput
+    apply trackpoint acceleration and middle-button scrolling to every
+    other mouse sharing the proxy.
+    """
+    caps = {}
+    props = None
+    for dev in devices:
+        for etype, codes in dev.capabilities(absinfo=True).items():
+            if etype in (e.EV_SYN, e.EV_FF, e.EV_REP):
+                continue
+            merged = caps.setdefault(etype, {})
+            for code in codes:
+                if isinstance(code, tuple):  # EV_ABS: (code, AbsInfo)
+                    merged[code[0]] = code[1]
+                else:
+                    merged.setdefault(code, None)
+        try:
+            dev_props = set(dev.input_props())
+        except OSError:
+            dev_props = set()
+        props = dev_props if props is None else props & dev_props
+    return caps, props or set()
 
-def main():
-    # Load configuration
-    config = load_config()
-    device_filter = config.get("device_name", "")
-    modifier_key_name = config.get("modifier_key", "KEY_LEFTMETA")
-    modifier_key = getattr(e, modifier_key_name, e.KEY_LEFTMETA)
-    
-    print(f"Configuration: device_filter='{device_filter}', modifier_key={modifier_key_name}")
-    
-    mice = find_mouse_devices(device_filter)
-    if not mice:
-        print("No mouse devices found!", file=sys.stderr)
-        sys.exit(1)
 
-    print(f"Found {len(mice)} mouse device(s). Grabbing them...")
+def uinput_capabilities(caps, *extra_keys):
+    """Capability union in the form UInput expects, plus extra EV_KEY codes.
 
-    # Combine capabilities of all mice for the virtual output
-    # This ensures the virtual mouse can do everything the real ones can
-    combined_caps = {
-        e.EV_KEY: [e.BTN_LEFT, e.BTN_RIGHT, e.BTN_MIDDLE, e.BTN_SIDE, e.BTN_EXTRA],
-        e.EV_REL: [e.REL_X, e.REL_Y, e.REL_WHEEL],
-        e.EV_MSC: [e.MSC_SCAN],
+    The buttons the gesture synthesizes are always included.
+    """
+    keys = caps.setdefault(e.EV_KEY, {})
+    for code in (e.BTN_LEFT, e.BTN_RIGHT) + extra_keys:
+        keys.setdefault(code, None)
+    return {
+        etype: [code if absinfo is None else (code, absinfo) for code, absinfo in sorted(codes.items())]
+        for etype, codes in caps.items()
     }
-    
-    # Add the configured modifier key to capabilities
-    combined_caps[e.EV_KEY].append(modifier_key)
 
-    # Create Virtual Mouse+Keyboard COMBO device
-    try:
-        vkbdmouse = UInput(combined_caps, name="Tiling Shell Proxy Device", version=0x3)
-    except Exception as err:
-        print(f"Failed to create virtual device: {err}", file=sys.stderr)
-        sys.exit(1)
 
-    # State
-    left_held = False
-    right_held = False
-    super_sent = False
-    
-    # Selector for reading multiple devices
-    sel = selectors.DefaultSelector()
-
-    # Grab devices
-    # WARNING: If this script crashes, the mouse might be unresponsive until reboot or ungrab
-    grabbed_devices = []
-    for mouse in mice:
+def supported_events(caps):
+    """Set of (type, code) pairs a capability union can represent."""
+    return {(etype, code) for etype, codes in caps.items() for code in codes}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Tiling Shell right-click activation daemon")
+    parser.add_argument("--capture", metavar="FILE",
+                        help="record every source event to FILE (replay with tools/replay_capture.py)")
+    parser.add_argument("--trace-latency", action="store_true",
+                        help="measure kernel-to-uinput latency per event; dumped on SIGUSR1 and at exit")
+    return parser.parse_args()
+
+
+class Route:
+    """Where a source device's events go: forwarder, output and gesture state."""
+
+    __slots__ = ("forwarder", "gesture", "output", "release_timer")
+
+    def __init__(self, output, modifier_key):
+        self.output = output
+        # Events are collected per source device and written out frame by frame
+        self.forwarder = FrameForwarder(output)
+        # Gesture state (left/right held, modifier sent) lives in a pure state machine
+        self.gesture = RightClickGesture(modifier_key)
+        self.release_timer = None
+
+
+class TilingRightclickProxy:
+    """Grabs mice and re-emits their events through virtual devices.
+
+    Runs as an InputHub handler. By default every mouse feeds one shared
+    proxy device with one gesture state. With per_device_outputs, each mouse
+    gets its own mirrored proxy device and gesture state, and the modifier
+    goes to a shared keyboard node.
+    """
+
+    def __init__(self, config, timers, trace_latency=False):
+        self.device_filter = config.get("device_name", "")
+        modifier_key_name = config.get("modifier_key", "KEY_LEFTMETA")
+        self.modifier_key = getattr(e, modifier_key_name, e.KEY_LEFTMETA)
+        self.commit_delay = config.get("commit_delay_ms", 50) / 1000.0
+        # Reads older than this get their motion frames merged; 0 is off
+        self.coalesce_after = int(config.get("coalesce_backlog_ms", 0) * 1_000_000)
+        self.per_device = config.get("per_device_outputs", False)
+        self.raw_output = config.get("raw_output", True)
+        self.trace_latency = trace_latency or config.get("trace_latency", False)
+        self.timers = timers
+        self.config = config
+
+        log.info("Configuration: device_filter='%s', modifier_key=%s, commit_delay_ms=%.0f, "
+                 "per_device_outputs=%s", self.device_filter, modifier_key_name,
+                 self.commit_delay * 1000, self.per_device)
+
+        self.shared = None  # Route shared by all devices (default mode)
+        self.keyboard = None  # Forwarder for the modifier node (per-device mode)
+        self.output_caps = {}  # Capabilities the shared output was created with
+        self.output_props = set()
+        self.keyboard_keys = []  # Keys the modifier node was created with
+        self.routes = {}  # fd -> Route
+        self.devices = {}  # path -> grabbed InputDevice
+        self.supported = set()  # (type, code) pairs the shared output device can emit
+        self.drop_filters = {}  # fd -> (type, code) pairs that source sends but we cannot
+        self.dropped = {}  # device path -> events dropped
+        self.overflows = {}  # device path -> SYN_DROPPED received (kernel buffer overflows)
+        self.resyncing = set()  # fds skipping events up to the SYN_REPORT after a SYN_DROPPED
+        self.snaps = 0  # Snap commits (right-click released during a drag)
+        self.coalesced = 0  # Motion frames merged into others under backlog
+        self.paused = False  # Mice released on request (control socket)
+        self.tracer = None
+
+    def wants(self, node):
+        if self.paused:
+            return None
+        return GRAB if is_mouse(node, self.device_filter) else None
+
+    def start(self, mice):
+        """Create the output device(s) for the mice found at startup."""
+        if not mice:
+            log.error("No mouse devices found!")
+            sys.exit(1)
+
+        log.info("Found %d mouse device(s). Grabbing them...", len(mice))
+
+        try:
+            self.create_output(mice)
+        except Exception as err:
+            log.error("Failed to create virtual device: %s", err)
+            sys.exit(1)
+
+        # Optional latency tracing
+        if self.trace_latency:
+            # The hub puts event timestamps on CLOCK_MONOTONIC
+            self.tracer = LatencyTracer(self.modifier_key, clock=time.monotonic_ns)
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.log_latency())
+            log.info("Latency tracing enabled (kill -USR1 %d to dump)", os.getpid())
+
+    def create_output(self, mice):
+        """Create the virtual device(s) shared by all mice."""
+        if self.per_device:
+            # Mice get their own devices on attach; only the modifier is shared
+            self.keyboard_keys = [self.modifier_key]
+            self.keyboard = FrameForwarder(self.create_keyboard_output())
+            return
+
+        # Mirror the union of the real devices' capabilities so passthrough is
+        # lossless (hi-res wheels, horizontal scroll, extra buttons), and only
+        # the input properties they all share
+        caps, props = union_capabilities(mice)
+        self.supported = supported_events(caps)
+        self.output_caps = caps
+        self.output_props = props
+
+        self.shared = Route(self.create_shared_output(self.modifier_key), self.modifier_key)
+
+    def create_shared_output(self, modifier_key):
+        # Virtual Mouse+Keyboard COMBO device; output_caps keeps every key added so far
+        return self.wrap_output(UInput(uinput_capabilities(self.output_caps, modifier_key), name=PROXY_NAME,
+                                       version=0x3, input_props=sorted(self.output_props)))
+
+    def create_keyboard_output(self):
+        return self.wrap_output(UInput({e.EV_KEY: self.keyboard_keys}, name=KEYBOARD_NAME, version=0x3))
+
+    def wrap_output(self, uinput):
+        """Whole frames in one write(2) (see raw_output.py) unless raw_output is off."""
+        return RawOutput.wrap(uinput) if self.raw_output else uinput
+
+    def create_device_output(self, device):
+        """Create a proxy device mirroring one mouse (per-device mode)."""
+        caps, props = union_capabilities([device])
+        info = device.info
+        # Same ids as the source so libinput applies that device's quirks and profile
+        output = UInput(uinput_capabilities(caps), name=f"{PROXY_NAME} ({device.name})",
+                        vendor=info.vendor, product=info.product, version=info.version,
+                        bustype=info.bustype, input_props=sorted(props))
+        return Route(self.wrap_output(output), self.modifier_key)
+
+    def attach(self, device):
+        """Start proxying a grabbed device. Returns False if it cannot be proxied."""
+        if self.per_device:
+            try:
+                route = self.create_device_output(device)
+            except Exception as err:
+                log.error("Failed to create virtual device for %s: %s", device.name, err)
+                return False
+        else:
+            route = self.shared
+            # A device hotplugged later may report codes the proxy device was not
+            # created with; the kernel would silently discard those, so drop and count
+            try:
+                missing = supported_events(union_capabilities([device])[0]) - self.supported
+            except OSError as err:
+                # The node went away again (hotplug of a re-enumerating receiver)
+                log.warning("Cannot read capabilities of %s: %s", device.name, err)
+                return False
+            if missing:
+                self.drop_filters[device.fd] = frozenset(missing)
+                log.warning("%s: %d event code(s) not supported by the proxy device will be dropped "
+                            "(restart the service to include them)", device.name, len(missing))
+
+        self.routes[device.fd] = route
+        self.devices[device.path] = device
+        return True
+
+    def detach(self, device):
+        """Stop proxying a device (lost or shutting down)."""
+        source = device.fd
+        route = self.routes.pop(source, None)
+        if route:
+            route.forwarder.discard(source)
+            if route is self.shared:
+                # The shared device stays: release the buttons and gesture
+                # state no remaining mouse holds, or the mouse's next
+                # right-click, once it is back, would become the modifier
+                self.release_stale(route, source, self.held_keys(route), self.output_caps.get(e.EV_KEY, ()))
+            else:
+                # The modifier lives on the shared keyboard node and outlives
+                # this device: release what the gesture holds, and finish a
+                # pending snap commit, before the device goes away
+                for etype, code, value in route.gesture.resync(False, False):
+                    self.gesture_event(route, source, RawEvent(0, 0, etype, code, value))
+                if route.release_timer:
+                    self.timers.cancel(route.release_timer)
+                self.release_modifier(route)
+                route.output.close()
+        if self.tracer:
+            self.tracer.discard(source)
+        self.drop_filters.pop(source, None)
+        self.resyncing.discard(source)
+        self.devices.pop(device.path, None)
+
+    def drop_unsupported(self, device, events, unsupported):
+        """Filter out events the proxy device cannot emit, counting them."""
+        kept = []
+        dropped = 0
+        for event in events:
+            if (event.type, event.code) in unsupported:
+                dropped += 1
+            else:
+                kept.append(event)
+        if dropped:
+            self.dropped[device.path] = self.dropped.get(device.path, 0) + dropped
+        return kept
+
+    def release_modifier(self, route):
+        route.release_timer = None
+        events = route.gesture.release_modifier()
+        if events:
+            (self.keyboard or route.forwarder).write_frame(events)
+            log.debug("Proxy: Released Super (Snap Committed)")
+
+    def reconfigure(self, config):
+        """Apply a reloaded config in place.
+
+        Returns True if the device filter changed; the caller applies it
+        with set_device_filter() once it may rescan.
+        """
+        # Everything is computed before anything is applied
+        commit_delay = config.get("commit_delay_ms", 50) / 1000.0
+        coalesce_after = int(config.get("coalesce_backlog_ms", 0) * 1_000_000)
+        modifier_key = getattr(e, config.get("modifier_key", "KEY_LEFTMETA"), e.KEY_LEFTMETA)
+
+        old = self.config
+        self.config = config
+        for key in RESTART_KEYS:
+            if config.get(key) != old.get(key):
+                log.warning("Config: %s changes take effect after a service restart", key)
+        self.commit_delay = commit_delay
+        self.coalesce_after = coalesce_after
+        if modifier_key != self.modifier_key:
+            self.set_modifier(modifier_key)
+        return config.get("device_name", "") != self.device_filter
+
+    def set_device_filter(self):
+        """Take the device filter from the config. Returns False while a drag is in progress.
+
+        A rescan must not release a mouse in the middle of a drag.
+        """
+        if self.gesture_active():
+            return False
+        device_filter = self.config.get("device_name", "")
+        if device_filter != self.device_filter:
+            log.info("Config: device filter '%s' -> '%s'", self.device_filter, device_filter)
+            self.device_filter = device_filter
+        return True
+
+    def gesture_active(self):
+        """Whether some route holds the modifier down (or is about to release it)."""
+        routes = set(self.routes.values())
+        if self.shared:
+            routes.add(self.shared)
+        return any(route.gesture.super_sent or route.gesture.release_pending for route in routes)
+
+    def set_modifier(self, modifier_key):
+        """Switch the key the gesture sends, extending the output devices only if needed."""
+        if self.config_modifier() != modifier_key:
+            return  # Superseded by a later reload
+        if self.gesture_active():
+            # The release must use the key that was pressed
+            self.timers.call_later(GESTURE_RETRY_DELAY, self.set_modifier, modifier_key)
+            return
         try:
-            mouse.grab()
-            grabbed_devices.append(mouse)
-            sel.register(mouse, selectors.EVENT_READ)
-            print(f"Grabbed {mouse.name}")
+            if self.shared and modifier_key not in self.output_caps.get(e.EV_KEY, {}):
+                output = self.create_shared_output(modifier_key)
+                old_output = self.shared.output
+                self.shared.output = self.shared.forwarder.output = output
+                old_output.close()
+                log.info("Config: recreated the proxy device to add the new modifier key")
+            if self.keyboard and modifier_key not in self.keyboard_keys:
+                self.keyboard_keys.append(modifier_key)
+                output = self.create_keyboard_output()
+                old_output = self.keyboard.output
+                self.keyboard.output = output
+                old_output.close()
         except Exception as err:
-            print(f"Could not grab {mouse.name}: {err}", file=sys.stderr)
+            log.error("Config: cannot switch modifier key, keeping the old one: %s", err)
+            return
+
+        self.modifier_key = modifier_key
+        for route in set(self.routes.values()) | ({self.shared} if self.shared else set()):
+            route.gesture.modifier_key = modifier_key
+        if self.tracer:
+            self.tracer.modifier_key = modifier_key
+        log.info("Config: modifier key is now %s", self.config.get("modifier_key"))
+
+    def config_modifier(self):
+        return getattr(e, self.config.get("modifier_key", "KEY_LEFTMETA"), e.KEY_LEFTMETA)
+
+    def log_latency(self):
+        for line in self.tracer.report():
+            log.info("%s", line)
+
+    def backlogged(self, sec, usec):
+        """Whether an event with this kernel timestamp waited past coalesce_backlog_ms."""
+        age = time.monotonic_ns() - (sec * 1_000_000_000 + usec * 1000)
+        return self.coalesce_after < age < MAX_BACKLOG_NS
+
+    def handle_raw(self, device, data, types, codes):
+        """Proxy a raw read batch (see raw_input.py).
 
-    if not grabbed_devices:
-        print("Could not grab any devices. Exiting.", file=sys.stderr)
+        Batches of whole frames without keys or buttons never touch the
+        gesture, so they go to the output as the bytes that were read.
+        Anything else, a possible SYN_DROPPED and a backlog to coalesce are
+        decoded and take the handle() path.
+        """
+        source = device.fd
+        route = self.routes[source]
+        output = route.output
+        if (e.EV_KEY in types or not isinstance(output, RawOutput) or self.tracer
+                or source in self.drop_filters or route.forwarder.pending.get(source)
+                or e.SYN_DROPPED in codes or source in self.resyncing
+                or last_event(data) != (e.EV_SYN, e.SYN_REPORT, 0)
+                or (self.coalesce_after and self.backlogged(*EVENT.unpack_from(data)[:2]))):
+            self.handle(device, decode(data))
+            return
+        output.send(data)
+        route.forwarder.frames += count_reports(data)
+        route.forwarder.events += len(data) // EVENT_SIZE
+
+    def handle(self, device, events):
+        """Proxy one read batch from a grabbed mouse."""
+        source = device.fd
+        route = self.routes[source]
+        forwarder = route.forwarder
+        if source in self.resyncing:
+            events = self.skip_dropped(device, route, iter(events))
+            if events is None:
+                return
+
+        unsupported = self.drop_filters.get(source)
+        if unsupported:
+            events = self.drop_unsupported(device, events, unsupported)
+        if self.coalesce_after:
+            # Catch up after a stall instead of replaying it (see motion_coalesce.py)
+            events = list(events)
+            if events and self.backlogged(events[0].sec, events[0].usec):
+                events, merged = coalesce(events, bool(forwarder.pending.get(source)))
+                self.coalesced += merged
+        events = iter(events)
+        if self.tracer:
+            self.handle_traced(device, route, events)
+            return
+
+        # Table dispatch (see DISPATCH): movement and everything else the
+        # gesture passes through goes straight into the frame; only
+        # SYN_REPORT, SYN_DROPPED and the left and right buttons branch off
+        frame = forwarder.frame(source)
+        for event in events:
+            etype = event.type
+            codes = DISPATCH[etype]
+            if codes is None:
+                frame.append((etype, event.code, event.value))
+                continue
+            action = codes.get(event.code)
+            if action is None:
+                frame.append((etype, event.code, event.value))
+            elif action == FLUSH:
+                forwarder.flush(source)
+            elif action == GESTURE:
+                self.gesture_event(route, source, event)
+            else:
+                self.overflow(device, route, events)
+                return
+
+    def handle_traced(self, device, route, events):
+        """handle() with the latency tracer observing every event."""
+        source = device.fd
+        forwarder = route.forwarder
+        tracer = self.tracer
+        for event in events:
+            codes = DISPATCH[event.type]
+            action = codes and codes.get(event.code)
+            if action == GESTURE:
+                out = self.gesture_event(route, source, event)
+            elif action == DROPPED:
+                self.overflow(device, route, events)
+                return
+            else:
+                forwarder.push(source, event.type, event.code, event.value)
+                out = ((event.type, event.code, event.value),)
+            tracer.observe(source, event.sec, event.usec, out)
+
+    def overflow(self, device, route, events):
+        """SYN_DROPPED: the kernel's buffer for device overflowed and events were lost.
+
+        The partial frame goes, the batch is skipped up to the next
+        SYN_REPORT, buttons are resynced and the rest of the batch proxied.
+        """
+        count = self.overflows[device.path] = self.overflows.get(device.path, 0) + 1
+        if count == 1:
+            log.warning("%s: events lost to a kernel buffer overflow, resyncing buttons", device.name)
+        else:
+            log.debug("%s: kernel buffer overflow #%d", device.name, count)
+        route.forwarder.discard(device.fd)
+        if self.tracer:
+            # Samples of the discarded partial frame are never written
+            self.tracer.discard(device.fd)
+        self.resyncing.add(device.fd)
+        events = self.skip_dropped(device, route, events)
+        if events is not None:
+            self.handle(device, events)
+
+    def skip_dropped(self, device, route, events):
+        """Consume events up to the SYN_REPORT ending a drop; the rest, or None if it is not in this batch."""
+        for event in events:
+            if event.type == e.EV_SYN and event.code == e.SYN_REPORT:
+                self.resyncing.discard(device.fd)
+                self.resync(device, route)
+                return events
+        return None
+
+    def resync(self, device, route):
+        """Release what the output holds but no mouse on its route does any more.
+
+        In shared mode the gesture state belongs to every mouse, so the key
+        state (EVIOCGKEY) is that of all of them, not just the one that
+        overflowed.
+        """
+        try:
+            keys = device.capabilities().get(e.EV_KEY, ())
+        except OSError as err:
+            log.warning("%s: cannot read button state after overflow: %s", device.name, err)
+            return
+        self.release_stale(route, device.fd, self.held_keys(route), keys)
+
+    def held_keys(self, route):
+        """Keys down (EVIOCGKEY) on the mice feeding route."""
+        pressed = set()
+        for device in self.devices.values():
+            if self.routes.get(device.fd) is not route:
+                continue
+            try:
+                pressed.update(device.active_keys())
+            except OSError:
+                pass  # Going away; its own detach releases what it held
+        return pressed
+
+    def release_stale(self, route, source, pressed, keys):
+        """Release gesture buttons and keys that are not in pressed, as one frame from source."""
+        for etype, code, value in route.gesture.resync(e.BTN_LEFT in pressed, e.BTN_RIGHT in pressed):
+            self.gesture_event(route, source, RawEvent(0, 0, etype, code, value))
+        # Other buttons bypass the gesture. The kernel ignores a release of a
+        # button that is not down, so every released one can be sent
+        forwarder = route.forwarder
+        modifier_key = self.modifier_key
+        for code in keys:
+            if code not in pressed and code != e.BTN_LEFT and code != e.BTN_RIGHT and code != modifier_key:
+                forwarder.push(source, e.EV_KEY, code, 0)
+        forwarder.flush(source)
+
+    def gesture_event(self, route, source, event):
+        """Run a left/right button event through the gesture; returns what was emitted."""
+        gesture = route.gesture
+        keyboard = self.keyboard
+        modifier_key = self.modifier_key
+
+        was_sent = gesture.super_sent
+        out = gesture.process(event.type, event.code, event.value)
+        for etype, code, value in out:
+            if keyboard and code == modifier_key:
+                # Per-device mode: modifiers live on the shared keyboard node
+                keyboard.write_frame(((etype, code, value),))
+            else:
+                route.forwarder.push(source, etype, code, value)
+
+        if out is COMMIT:
+            # Window dropped while the modifier is still held; give
+            # Tiling Shell time to process the drop before releasing it.
+            # Input keeps flowing while the release is pending.
+            if route.release_timer:
+                self.timers.cancel(route.release_timer)
+            route.release_timer = self.timers.release_later(self.commit_delay, self.release_modifier, route)
+            self.snaps += 1
+            log.debug("Proxy: Dropped Window (Snap Committing)")
+        elif gesture.super_sent and not was_sent:
+            log.debug("Proxy: Swapped Right->Super (Active)")
+        return out
+
+    def close_outputs(self):
+        if self.shared:
+            self.shared.output.close()
+        if self.keyboard:
+            self.keyboard.output.close()
+
+    def close(self):
+        # Pending modifier releases already ran (the hub flushes its timers first)
+        if self.tracer:
+            self.log_latency()
+        for path, count in self.dropped.items():
+            log.warning("Dropped %d unsupported event(s) from %s", count, path)
+        self.close_outputs()
+
+
+class SuperTapHandler:
+    """SUPER tap to Activity View (super-activity-view), run inside the hub.
+
+    Reads keyboards and mice without grabbing them, including the mice the
+    proxy grabs, so SUPER+scroll on those is seen as well.
+    """
+
+    def __init__(self, config, timers):
+        trigger_key = getattr(e, config.get("trigger_key", "KEY_LEFTMETA"), e.KEY_LEFTMETA)
+        self.injection_key = getattr(e, config.get("injection_key", "KEY_LEFTCTRL"), e.KEY_LEFTCTRL)
+        self.tap = SuperTap({trigger_key})
+        self.timers = timers
+        self.output = None
+        self.taps = 0
+
+        log.info("SUPER tap: trigger=%s, injection=%s",
+                 config.get("trigger_key"), config.get("injection_key"))
+
+    def wants(self, node):
+        return READ if is_tap_source(node) else None
+
+    def start(self, devices):
+        try:
+            self.output = UInput(name=INJECTOR_NAME)
+        except Exception as err:
+            log.error("SUPER tap: failed to create UInput device: %s", err)
+
+    def attach(self, device):
+        return True
+
+    def detach(self, device):
+        pass
+
+    def handle(self, device, events):
+        tap = self.tap
+        for event in events:
+            # Timed from kernel timestamps, so backlog cannot turn a hold into a tap
+            if tap.process(event.type, event.code, event.value, event.sec, event.usec) is TAP:
+                log.debug("Clean SUPER tap detected (%.3fs)", tap.held)
+                self.taps += 1
+                self.trigger_activity_view()
+
+    def handle_raw(self, device, data, types, codes):
+        tap = self.tap
+        for sec, usec, etype, code, value in EVENT.iter_unpack(data):
+            if tap.process(etype, code, value, sec, usec) is TAP:
+                log.debug("Clean SUPER tap detected (%.3fs)", tap.held)
+                self.taps += 1
+                self.trigger_activity_view()
+
+    def trigger_activity_view(self):
+        if not self.output:
+            return
+        try:
+            self.output.write(e.EV_KEY, self.injection_key, 1)
+            self.output.syn()
+        except OSError as err:
+            log.error("Failed to inject keys: %s", err)
+            return
+        self.timers.release_later(INJECT_HOLD, self.release_injection)
+
+    def release_injection(self):
+        try:
+            self.output.write(e.EV_KEY, self.injection_key, 0)
+            self.output.syn()
+        except OSError as err:
+            log.error("Failed to inject keys: %s", err)
+
+    def close(self):
+        if self.output:
+            self.output.close()
+
+
+class ConfigReloader:
+    """Applies config.json changes in place, on rewrite (inotify) or SIGHUP.
+
+    Grabs, output devices and gesture state survive a reload; only the
+    devices a new filter affects are grabbed or released.
+    """
+
+    def __init__(self, hub, proxy):
+        self.hub = hub
+        self.proxy = proxy
+        self.pending = None
+        try:
+            self.watcher = DeviceWatcher(os.path.dirname(CONFIG_PATH), prefix=os.path.basename(CONFIG_PATH),
+                                         mask=IN_CLOSE_WRITE | IN_MOVED_TO)
+            hub.add_reader(self.watcher, self.on_config_written)
+        except OSError as err:
+            self.watcher = None
+            log.warning("Not watching %s (SIGHUP still reloads): %s", CONFIG_PATH, err)
+
+        # The signal handler only writes to a pipe; the reload runs from the loop
+        self.wakeup, self.notify = os.pipe()
+        os.set_blocking(self.wakeup, False)
+        os.set_blocking(self.notify, False)
+        hub.add_reader(self.wakeup, self.on_sighup)
+        signal.signal(signal.SIGHUP, self.on_signal)
+
+    def on_signal(self, signum, frame):
+        try:
+            os.write(self.notify, b"\0")
+        except BlockingIOError:
+            pass  # A reload is already queued
+
+    def on_sighup(self):
+        try:
+            os.read(self.wakeup, 64)
+        except BlockingIOError:
+            pass
+        self.reload()
+
+    def on_config_written(self):
+        if not self.watcher.read():
+            return
+        if self.pending:
+            self.hub.timers.cancel(self.pending)
+        self.pending = self.hub.timers.call_later(RELOAD_DELAY, self.reload)
+
+    def reload(self):
+        """Apply config.json; False if it could not be read (the old config stays)."""
+        self.pending = None
+        config = load_config(strict=True)
+        if config is None:
+            return False
+        log.set_level(config.get("log_level", "info"))
+        log.info("Reloading %s", CONFIG_PATH)
+        if self.proxy.reconfigure(config):
+            # After the current select batch, which may hold the devices
+            # the rescan releases
+            self.hub.timers.call_later(0, self.apply_device_filter)
+        return True
+
+    def apply_device_filter(self):
+        if not self.proxy.set_device_filter():
+            self.hub.timers.call_later(GESTURE_RETRY_DELAY, self.apply_device_filter)
+            return
+        self.hub.rescan()
+
+
+class ProxyControl:
+    """Control socket commands (see control_socket.py) for the proxy process."""
+
+    def __init__(self, hub, proxy, reloader, super_handler=None):
+        self.hub = hub
+        self.proxy = proxy
+        self.reloader = reloader
+        self.super_handler = super_handler
+        self.server = ControlServer(PROXY_SOCKET, {
+            "status": self.status,
+            "devices": self.devices,
+            "stats": self.stats,
+            "config": self.config,
+            "reload": self.reload,
+            "pause": self.pause,
+            "resume": self.resume,
+        }, log)
+
+    def start(self):
+        try:
+            self.server.start(self.hub.add_reader, self.hub.remove_reader)
+        except OSError as err:
+            log.warning("No control socket at %s: %s", PROXY_SOCKET, err)
+
+    def close(self):
+        self.server.close()
+
+    def status(self, request):
+        return {
+            "service": "tiling-rightclick",
+            "pid": os.getpid(),
+            "uptime": self.server.uptime(),
+            "paused": self.proxy.paused,
+            "grabbed": len(self.proxy.devices),
+            "super_tap": self.super_handler is not None,
+        }
+
+    def devices(self, request):
+        proxy = self.proxy
+        devices = []
+        for path, device in sorted(self.hub.devices.items()):
+            devices.append({
+                "path": path,
+                "name": device.name,
+                "grabbed": device.fd in self.hub.grabbed,
+                "proxied": path in proxy.devices,
+                "dropped": proxy.dropped.get(path, 0),
+                "overflows": proxy.overflows.get(path, 0),
+            })
+        return {"devices": devices}
+
+    def stats(self, request):
+        proxy = self.proxy
+        forwarders = {route.forwarder for route in proxy.routes.values()}
+        if proxy.shared:
+            forwarders.add(proxy.shared.forwarder)
+        if proxy.keyboard:
+            forwarders.add(proxy.keyboard)
+        stats = {
+            "frames": sum(forwarder.frames for forwarder in forwarders),
+            "events": sum(forwarder.events for forwarder in forwarders),
+            "snaps": proxy.snaps,
+            "coalesced": proxy.coalesced,
+            "dropped": sum(proxy.dropped.values()),
+            "overflows": sum(proxy.overflows.values()),
+        }
+        if self.super_handler:
+            stats["taps"] = self.super_handler.taps
+        return stats
+
+    def config(self, request):
+        return {"config": self.proxy.config}
+
+    def reload(self, request):
+        if not self.reloader.reload():
+            raise ControlError(f"{CONFIG_PATH} could not be read; the current config stays")
+        return {"config": self.proxy.config}
+
+    def pause(self, request):
+        """Release every mouse until resume (the proxy devices stay)."""
+        if self.proxy.paused:
+            return {"paused": True}
+        if self.proxy.gesture_active():
+            raise ControlError("a drag is in progress")
+        self.proxy.paused = True
+        self.hub.rescan()
+        log.info("Paused: mice released")
+        return {"paused": True}
+
+    def resume(self, request):
+        if self.proxy.paused:
+            self.proxy.paused = False
+            self.hub.rescan()
+            log.info("Resumed: %d mouse device(s) grabbed", len(self.proxy.devices))
+        return {"paused": False}
+
+
+def main():
+    args = parse_args()
+
+    # Load configuration
+    config = load_config()
+    log.set_level(config.get("log_level", "info"))
+
+    # One reader per physical device; the proxy (and the SUPER tap detector)
+    # are handlers on it, so every event wakes a single process
+    hub = InputHub(log, capture_path=args.capture, raw_input=config.get("raw_input", True))
+    proxy = TilingRightclickProxy(config, hub.timers, trace_latency=args.trace_latency)
+    hub.add_handler(proxy)
+    super_handler = None
+    if config.get("super_tap", False):
+        super_handler = SuperTapHandler(load_super_config(), hub.timers)
+        hub.add_handler(super_handler)
+
+    hub.start()
+    if not proxy.devices:
+        log.error("Could not grab any devices. Exiting.")
+        hub.close()
         sys.exit(1)
 
-    print("Proxy running. Press Ctrl+C to stop (and ungrab).")
+    # systemctl stop sends SIGTERM; unwind through the hub's cleanup
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    # Edits to the config (or systemctl reload) apply without dropping grabs
+    reloader = ConfigReloader(hub, proxy)
+    # Status, stats and pause/resume for the indicator and the config GUI
+    control = ProxyControl(hub, proxy, reloader, super_handler)
+    control.start()
 
     try:
-        while True:
-            for key, mask in sel.select():
-                device = key.fileobj
-                try:
-                    for event in device.read():
-                        
-                        # Handle Keys (Buttons)
-                        if event.type == e.EV_KEY:
-                            if event.code == e.BTN_LEFT:
-                                left_held = (event.value == 1)
-                                vkbdmouse.write_event(event) # Passthrough Left Click
-                                
-                            elif event.code == e.BTN_RIGHT:
-                                right_held = (event.value == 1)
-                                
-                                # Logic: If Left is held, treat Right as Super
-                                if left_held:
-                                    if right_held:
-                                        if not super_sent:
-                                            # Send Super Down instead of Right Down
-                                            vkbdmouse.write(e.EV_KEY, modifier_key, 1)
-                                            super_sent = True
-                                            print("Proxy: Swapped Right->Super (Active)")
-                                    else: # Right released
-                                        if super_sent:
-                                            # User released Right Click while in "Snap Mode"
-                                            # We must Drop the window (Left Up) WHILE Super is still held.
-                                            
-                                            # 1. Force release Left Click (Drop window into zone)
-                                            vkbdmouse.write(e.EV_KEY, e.BTN_LEFT, 0)
-                                            vkbdmouse.syn()
-                                            
-                                            # 2. Give Tiling Shell time to process the drop
-                                            time.sleep(0.05)  # 50ms delay
-                                            
-                                            # 3. Release SUPER (Deactivate tiling mode)
-                                            vkbdmouse.write(e.EV_KEY, modifier_key, 0)
-                                            vkbdmouse.syn()
-                                            
-                                            super_sent = False
-                                            left_held = False # We forced it up
-                                            
-                                            print("Proxy: Dropped Window & Released Super (Snap Committed)")
-                                        else:
-                                            # If we never sent super (maybe left wasn't held when right started?), pass through
-                                            vkbdmouse.write_event(event)
-                                else:
-                                    # Left not held, normal Right Click behavior
-                                    # BUT if we were sending super, we should probably stop? 
-                                    # e.g. User releases left before right.
-                                    if super_sent and not right_held: # Released right while super was active
-                                         vkbdmouse.write(e.EV_KEY, modifier_key, 0)
-                                         super_sent = False
-                                    elif not super_sent:
-                                         vkbdmouse.write_event(event) # Normal pass through
-                                    
-                            else:
-                                # Other buttons passed through
-                                vkbdmouse.write_event(event)
-                                
-                            vkbdmouse.syn()
-
-                        # Pass through Movement and everything else
-                        else:
-                            vkbdmouse.write_event(event)
-                            vkbdmouse.syn()
-                            
-                except OSError:
-                    # Device lost
-                    sel.unregister(device)
-                    try:
-                        device.ungrab()
-                    except:
-                        pass
-                    device.close()
-
-    except KeyboardInterrupt:
-        print("Stopping...")
+        # Last, so startup allocations are frozen and only the loop runs real-time
+        tune(config, log, hub.timers)
+        log.info("Proxy running. Press Ctrl+C to stop (and ungrab).")
+        hub.run()
     finally:
-        # Ungrab everything to restore mouse
-        for dev in grabbed_devices:
-            try:
-                dev.ungrab()
-            except:
-                pass
-        vkbdmouse.close()
+        control.close()
+        log.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,72 @@
+"""
+Deferred actions for the tiling-rightclick selector loop.
+
+The proxy must never sleep inside the event loop: a blocking delay stalls
+every grabbed device. TimerQueue keeps callbacks ordered by deadline; the
+loop passes timeout() to selector.select() and calls run_due() after each
+wakeup, so deferred work runs on time while input keeps flowing.
+"""
+
+import heapq
+import itertools
+import time
+
+
+class TimerQueue:
+    """Monotonic-clock callback queue driven by the selector timeout."""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.heap = []  # (deadline, seq, entry)
+        self.seq = itertools.count()
+
+    def call_later(self, delay, callback, *args):
+        """Schedule callback(*args) after delay seconds; returns a handle."""
+        entry = [callback, args, False]
+        heapq.heappush(self.heap, (self.clock() + delay, next(self.seq), entry))
+        return entry
+
+    def release_later(self, delay, callback, *args):
+        """call_later() for a key release, which run_all() still runs at shutdown."""
+        entry = [callback, args, True]
+        heapq.heappush(self.heap, (self.clock() + delay, next(self.seq), entry))
+        return entry
+
+    def cancel(self, handle):
+        """Cancel a scheduled callback. Cancelling twice is harmless."""
+        handle[0] = None
+
+    def timeout(self):
+        """Seconds until the next deadline, or None when nothing is queued."""
+        heap = self.heap
+        while heap and heap[0][2][0] is None:
+            heapq.heappop(heap)
+        if not heap:
+            return None
+        return max(0.0, heap[0][0] - self.clock())
+
+    def run_due(self):
+        """Run every callback whose deadline has passed."""
+        heap = self.heap
+        now = self.clock()
+        while heap and heap[0][0] <= now:
+            _, _, entry = heapq.heappop(heap)
+            callback, args, _ = entry
+            if callback is not None:
+                entry[0] = None
+                callback(*args)
+
+    def run_all(self):
+        """Run the queued key releases now, regardless of deadline (shutdown).
+
+        Everything else is dropped: a pending config reload or attach retry
+        would open and grab devices that are about to be torn down. Callbacks
+        that schedule again are not run a second time, so this always returns.
+        """
+        heap, self.heap = self.heap, []
+        while heap:
+            _, _, entry = heapq.heappop(heap)
+            callback, args, at_shutdown = entry
+            if callback is not None and at_shutdown:
+                entry[0] = None
+                callback(*args)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Startup-time benchmark for input device discovery.
+
+Builds a fake /sys/class/input tree (and matching /proc/bus/input/devices
+text) that looks like a docking station setup: a few mice and keyboards
+among many other nodes. It times discovery through input_discovery and
+counts how many nodes each approach opens.
+
+With --real it also times discovery on this machine: the sysfs path vs
+the old way of opening every evdev node and calling capabilities() (needs
+python-evdev and read access to /dev/input).
+
+Usage: python3 tools/bench_discovery.py [--nodes N] [--rounds N] [--real]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from input_codes import EV_SYN, EV_KEY, EV_REL, EV_MSC, BTN_LEFT, BTN_RIGHT, REL_X, REL_Y
+import input_discovery
+from input_discovery import BITS_PER_LONG, list_sysfs_nodes, list_proc_nodes
+
+
+def format_bitmap(codes):
+    """Inverse of parse_bitmap: kernel style space separated longs."""
+    value = 0
+    for code in codes:
+        value |= 1 << code
+    words = []
+    while True:
+        words.append(f"{value & ((1 << BITS_PER_LONG) - 1):x}")
+        value >>= BITS_PER_LONG
+        if not value:
+            break
+    return " ".join(reversed(words))
+
+
+def fake_device(index):
+    """Name and capabilities for fake node index: 1 in 8 mouse, 1 in 8 keyboard."""
+    kind = index % 8
+    if kind == 0:
+        return f"Fake Mouse {index}", [EV_SYN, EV_KEY, EV_REL, EV_MSC], [BTN_LEFT, BTN_RIGHT], [REL_X, REL_Y]
+    if kind == 1:
+        return f"Fake Keyboard {index}", [EV_SYN, EV_KEY, EV_MSC], list(range(1, 120)), []
+    return f"Fake Dock Node {index}", [EV_SYN, EV_KEY], [113, 114, 115], []
+
+
+def build_tree(root, count):
+    sysfs = os.path.join(root, "sys")
+    os.makedirs(sysfs)
+    proc_blocks = []
+    for index in range(count):
+        name, ev, keys, rels = fake_device(index)
+        device = os.path.join(sysfs, f"event{index}", "device")
+        os.makedirs(os.path.join(device, "id"))
+        os.makedirs(os.path.join(device, "capabilities"))
+        files = {
+            "name": name, "phys": f"usb-0000:00:14.0-{index}/input0", "uniq": "",
+            "properties": "0",
+            "id/bustype": "0003", "id/vendor": "046d", "id/product": f"{index:04x}", "id/version": "0111",
+            "capabilities/ev": format_bitmap(ev),
+            "capabilities/key": format_bitmap(keys),
+            "capabilities/rel": format_bitmap(rels),
+        }
+        for rel_path, text in files.items():
+            with open(os.path.join(device, rel_path), "w") as f:
+                f.write(text + "\n")
+        proc_blocks.append("\n".join([
+            f"I: Bus=0003 Vendor=046d Product={index:04x} Version=0111",
+            f'N: Name="{name}"',
+            f"P: Phys=usb-0000:00:14.0-{index}/input0",
+            f"H: Handlers=event{index}",
+            "B: PROP=0",
+            f"B: EV={format_bitmap(ev)}",
+            f"B: KEY={format_bitmap(keys)}",
+            f"B: REL={format_bitmap(rels)}",
+        ]))
+    proc = os.path.join(root, "devices")
+    with open(proc, "w") as f:
+        f.write("\n\n".join(proc_blocks) + "\n\n")
+    return sysfs, proc
+
+
+def best_of(rounds, func):
+    best = None
+    result = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_real(rounds):
+    try:
+        import evdev
+        from evdev import ecodes
+    except ImportError:
+        print("python-evdev not installed, skipping --real")
+        return
+
+    def open_all():
+        wanted = 0
+        for path in evdev.list_devices():
+            try:
+                dev = evdev.InputDevice(path)
+            except OSError:
+                continue
+            if ecodes.EV_REL in dev.capabilities():
+                wanted += 1
+            dev.close()
+        return wanted
+
+    def from_sysfs():
+        return sum(1 for node in input_discovery.list_input_nodes() if node.is_mouse)
+
+    old, mice = best_of(rounds, open_all)
+    new, _ = best_of(rounds, from_sysfs)
+    print(f"real  open+capabilities(): {old * 1000:8.2f} ms, {mice} mice")
+    print(f"real  sysfs:               {new * 1000:8.2f} ms, then open {mice} node(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--nodes", type=int, default=32, help="fake input nodes (default: 32)")
+    parser.add_argument("--rounds", type=int, default=20, help="repetitions, best is reported")
+    parser.add_argument("--real", action="store_true", help="also benchmark this machine's devices")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        sysfs, proc = build_tree(root, args.nodes)
+        sysfs_time, nodes = best_of(args.rounds, lambda: list_sysfs_nodes(sysfs, "/dev/input"))
+        proc_time, proc_nodes = best_of(args.rounds, lambda: list_proc_nodes(proc, "/dev/input", sysfs))
+
+    mice = [node for node in nodes if node.is_mouse]
+    keyboards = [node for node in nodes if node.is_keyboard]
+    for a, b in zip(nodes, proc_nodes):
+        assert all(getattr(a, slot) == getattr(b, slot) for slot in a.__slots__), \
+            f"/proc and sysfs disagree about {a.path}"
+    assert len(proc_nodes) == len(nodes), "/proc and sysfs disagree"
+    print(f"{args.nodes} fake nodes: {len(mice)} mice, {len(keyboards)} keyboards")
+    print(f"fake  sysfs scan: {sysfs_time * 1000:8.2f} ms")
+    print(f"fake  /proc scan: {proc_time * 1000:8.2f} ms")
+    monitored = sum(1 for node in nodes if node.is_mouse or node.is_keyboard)
+    print(f"nodes opened: old {args.nodes} (every node), "
+          f"proxy {len(mice)}, SUPER daemon {monitored}, config GUI 0")
+
+    if args.real:
+        bench_real(args.rounds)
+
+
+if __name__ == "__main__":
+    main()
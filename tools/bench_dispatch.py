@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Per-event dispatch cost of the tiling-rightclick proxy: if-chain vs table.
+
+Runs a synthetic 8 kHz mouse stream (InputEvent-like objects, as the proxy
+gets them from a read) through two copies of the proxy's handle() loop:
+
+    chain   the previous loop: every event checked against EV_KEY, passed
+            through FrameForwarder.push(), every key through the gesture
+    table   the current loop: DISPATCH indexed by type (and by code for
+            EV_SYN and EV_KEY only), passthrough appended to the pending
+            frame, only SYN_REPORT and the left and right buttons branch off
+
+The output is a sink without syscalls, so only dispatch and framing are
+timed, and both loops must produce the same frames. A drag + snap every
+second keeps the gesture path in the run.
+
+Usage: python3 tools/bench_dispatch.py [--seconds N] [--rate HZ] [--frames-per-read N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from input_codes import EV_KEY
+from frame_forwarder import FrameForwarder
+from rightclick_gesture import RightClickGesture, DISPATCH, FLUSH
+from raw_input import RawEvent
+from gesture_replay import synthetic_stream, KEY_LEFTMETA
+
+SOURCE = 3
+
+
+class FrameSink:
+    """Output that keeps the frames it was given, or only counts them."""
+
+    def __init__(self, keep=False):
+        self.frames = [] if keep else None
+        self.count = 0
+
+    def write_frame(self, events):
+        self.count += 1
+        if self.frames is not None:
+            self.frames.append(tuple(events))
+
+
+def reads(events, frames_per_read):
+    """Split a stream into read batches of whole frames, as event objects."""
+    batches = []
+    batch = []
+    frames = 0
+    for etype, code, value in events:
+        batch.append(RawEvent(0, 0, etype, code, value))
+        if etype == 0 and code == 0:
+            frames += 1
+            if frames == frames_per_read:
+                batches.append(batch)
+                batch = []
+                frames = 0
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def run_chain(batches, sink):
+    forwarder = FrameForwarder(sink)
+    gesture = RightClickGesture(KEY_LEFTMETA)
+    for events in batches:
+        for event in events:
+            if event.type != EV_KEY:
+                forwarder.push(SOURCE, event.type, event.code, event.value)
+                continue
+            for etype, code, value in gesture.process(event.type, event.code, event.value):
+                forwarder.push(SOURCE, etype, code, value)
+            if gesture.release_pending:
+                forwarder.write_frame(gesture.release_modifier())
+
+
+def run_table(batches, sink):
+    forwarder = FrameForwarder(sink)
+    gesture = RightClickGesture(KEY_LEFTMETA)
+    for events in batches:
+        frame = forwarder.frame(SOURCE)
+        for event in events:
+            etype = event.type
+            codes = DISPATCH[etype]
+            if codes is None:
+                frame.append((etype, event.code, event.value))
+                continue
+            action = codes.get(event.code)
+            if action is None:
+                frame.append((etype, event.code, event.value))
+            elif action == FLUSH:
+                forwarder.flush(SOURCE)
+            else:
+                for etype, code, value in gesture.process(etype, event.code, event.value):
+                    forwarder.push(SOURCE, etype, code, value)
+                if gesture.release_pending:
+                    forwarder.write_frame(gesture.release_modifier())
+
+
+def measure(name, runner, batches, events, rounds):
+    # Best of several runs; a busy machine only ever makes a run slower
+    best = None
+    for _ in range(rounds):
+        sink = FrameSink()
+        start = time.perf_counter_ns()
+        runner(batches, sink)
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{name:<6} {best / events:>7.1f} ns/event  {events / best * 1e9:>12,.0f} events/s  "
+          f"{sink.count:,} frames")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=int, default=10, help="stream length (default: 10)")
+    parser.add_argument("--rate", type=int, default=8000, help="frames per second (default: 8000)")
+    parser.add_argument("--frames-per-read", type=int, default=1,
+                        help="frames per read batch (default: 1)")
+    parser.add_argument("--rounds", type=int, default=15, help="runs per loop, best is reported (default: 15)")
+    args = parser.parse_args()
+
+    stream = synthetic_stream(args.seconds * args.rate, args.rate)
+    batches = reads(stream, max(1, args.frames_per_read))
+
+    chain, table = FrameSink(keep=True), FrameSink(keep=True)
+    run_chain(batches, chain)
+    run_table(batches, table)
+    if chain.frames != table.frames:
+        print("FAIL: the two loops forwarded different frames", file=sys.stderr)
+        sys.exit(1)
+
+    keys = sum(1 for event in stream if event[0] == EV_KEY)
+    print(f"{len(stream):,} events at {args.rate} Hz ({keys} button events), "
+          f"{len(batches):,} reads")
+    old = measure("chain", run_chain, batches, len(stream), args.rounds)
+    new = measure("table", run_table, batches, len(stream), args.rounds)
+    print(f"speedup {old / new:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Read-path benchmark for the tiling-rightclick proxy: python-evdev vs RawReader.
+
+Each iteration writes one read's worth of mouse frames into a pipe (the
+device) and handles it the way the proxy does:
+
+    evdev   read() as python-evdev does it (a list of tuples, then an
+            InputEvent built in Python per event), every event through
+            FrameForwarder to a RawOutput
+    raw     RawReader.read() (readv into a reused buffer), the type fields
+            checked for keys, and the batch handed to RawOutput as the
+            same bytes
+
+Both write to /dev/null, one write(2) per frame or batch. Reported per core
+(CPU time), with the number of collections that ran.
+
+Usage: python3 tools/bench_raw_read.py [--reads N] [--frames-per-read N]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from input_codes import EV_SYN, EV_KEY, EV_REL, SYN_REPORT, REL_X, REL_Y
+from frame_forwarder import FrameForwarder
+from raw_input import EVENT, RawReader, last_event
+from raw_output import RawOutput
+
+READ_EVENTS = 64
+
+
+class InputEvent:
+    """python-evdev's InputEvent: a slotted object built in Python per event."""
+
+    __slots__ = ("sec", "usec", "type", "code", "value")
+
+    def __init__(self, sec, usec, type, code, value):
+        self.sec = sec
+        self.usec = usec
+        self.type = type
+        self.code = code
+        self.value = value
+
+
+class NullDevice:
+    """UInput stand-in whose fd is /dev/null."""
+
+    def __init__(self):
+        self.fd = os.open(os.devnull, os.O_WRONLY)
+
+    def close(self):
+        os.close(self.fd)
+
+
+def batch(frames):
+    """Bytes of one read: REL_X, REL_Y, SYN_REPORT per frame."""
+    data = b""
+    for i in range(frames):
+        data += EVENT.pack(0, i, EV_REL, REL_X, 1) + EVENT.pack(0, i, EV_REL, REL_Y, -1)
+        data += EVENT.pack(0, i, EV_SYN, SYN_REPORT, 0)
+    return data
+
+
+def run_evdev(reads, data, fd_in, fd_out):
+    output = NullDevice()
+    forwarder = FrameForwarder(RawOutput(output))
+    push = forwarder.push
+
+    def read():
+        # python-evdev: device_read_many() returns tuples, read() wraps each
+        events = list(EVENT.iter_unpack(os.read(fd_in, READ_EVENTS * EVENT.size)))
+        for event in events:
+            yield InputEvent(*event)
+
+    for _ in range(reads):
+        os.write(fd_out, data)
+        for event in read():
+            if event.type != EV_KEY:
+                push(3, event.type, event.code, event.value)
+    output.close()
+
+
+def run_raw(reads, data, fd_in, fd_out):
+    output = NullDevice()
+    raw = RawOutput(output)
+    reader = RawReader(fd_in, READ_EVENTS)
+    for _ in range(reads):
+        os.write(fd_out, data)
+        batch = reader.read()
+        if EV_KEY in reader.types(batch) or last_event(batch) != (EV_SYN, SYN_REPORT, 0):
+            raise AssertionError("motion-only batch expected")
+        raw.send(batch)
+    output.close()
+
+
+def measure(name, runner, reads, data):
+    fd_in, fd_out = os.pipe()
+    gc.collect()
+    collections = sum(stat["collections"] for stat in gc.get_stats())
+    start = time.process_time()
+    runner(reads, data, fd_in, fd_out)
+    elapsed = time.process_time() - start
+    collections = sum(stat["collections"] for stat in gc.get_stats()) - collections
+    os.close(fd_in)
+    os.close(fd_out)
+    events = reads * len(data) // EVENT.size
+    rate = events / elapsed
+    print(f"{name:<8} {rate:>12,.0f} events/s per core  {elapsed / events * 1e9:>6.0f} ns/event  "
+          f"{collections} GC runs")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reads", type=int, default=200_000, help="reads to handle (default: 200000)")
+    parser.add_argument("--frames-per-read", type=int, default=1,
+                        help="frames queued per read; 1 at 1 kHz, more under backlog (default: 1)")
+    args = parser.parse_args()
+    frames = max(1, min(args.frames_per_read, READ_EVENTS // 3))
+
+    data = batch(frames)
+    print(f"{args.reads:,} reads of {frames} frame(s), {len(data) // EVENT.size} events each")
+    evdev = measure("evdev", run_evdev, args.reads, data)
+    raw = measure("raw", run_raw, args.reads, data)
+    print(f"speedup  {raw / evdev:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
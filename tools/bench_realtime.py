@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Forward latency of the proxy loop under CPU contention, untuned and tuned.
+
+A feeder process stands in for a 1000 Hz mouse: it writes a timestamp per
+frame into a pipe. The reader runs the proxy's loop shape (selector, one
+read per wakeup, an event object per event, FrameForwarder to a sink that
+does one write(2) per event) and records how long after the write each
+frame went out. Busy-loop processes keep every CPU occupied meanwhile, and
+the reader holds a daemon-sized heap and a ring of recent events, so
+collector pauses land in the tail like they do in the daemon.
+
+The same load runs twice, each in a fresh process: untuned, then with
+realtime.tune() (SCHED_FIFO, optional CPU affinity, mlockall, GC tuning).
+SCHED_FIFO and mlockall need root; refused steps are logged and skipped.
+
+Usage: sudo python3 tools/bench_realtime.py [--seconds 10] [--hogs N] [--priority 50] [--cpus 0,1]
+"""
+
+import argparse
+import array
+import collections
+import gc
+import json
+import os
+import selectors
+import signal
+import struct
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from input_codes import EV_SYN, EV_REL, SYN_REPORT, REL_X, REL_Y
+from frame_forwarder import FrameForwarder
+from daemon_log import DaemonLog
+from realtime import tune
+
+STAMP = struct.Struct("q")
+FRAME = ((EV_REL, REL_X, 1), (EV_REL, REL_Y, -1), (EV_SYN, SYN_REPORT, 0))
+
+# Long-lived objects a running daemon holds (evdev code tables, devices, caches)
+HEAP_OBJECTS = 200_000
+# Recent events kept alive, like the latency tracer and the log ring do
+RECENT_EVENTS = 4096
+
+
+class Event:
+    """Stands in for evdev.InputEvent, allocated per event like python-evdev does."""
+
+    __slots__ = ("type", "code", "value")
+
+    def __init__(self, etype, code, value):
+        self.type = etype
+        self.code = code
+        self.value = value
+
+
+class NullSink:
+    """Stands in for UInput: one write(2) per event."""
+
+    def __init__(self):
+        self.fd = os.open(os.devnull, os.O_WRONLY)
+        self.buf = bytes(24)
+
+    def write(self, etype, code, value):
+        os.write(self.fd, self.buf)
+
+
+def feed(fd, seconds, rate):
+    """Feeder process: one timestamp per frame, then EOF."""
+    interval = 1 / rate
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        os.write(fd, STAMP.pack(time.monotonic_ns()))
+        time.sleep(interval)
+    os.close(fd)
+
+
+def forward(fd):
+    """The reader: the proxy's loop until the feeder closes the pipe."""
+    sel = selectors.DefaultSelector()
+    sel.register(fd, selectors.EVENT_READ)
+    forwarder = FrameForwarder(NullSink())
+    recent = collections.deque(maxlen=RECENT_EVENTS)
+    latencies = array.array("q")
+    clock = time.monotonic_ns
+    while True:
+        for key, mask in sel.select():
+            data = os.read(fd, 65536)
+            if not data:
+                return latencies
+            for stamp, in STAMP.iter_unpack(data):
+                for etype, code, value in FRAME:
+                    event = Event(etype, code, value)
+                    recent.append(event)
+                    forwarder.push(0, event.type, event.code, event.value)
+                latencies.append(clock() - stamp)
+
+
+def run_child(args):
+    """One measurement in this process; prints a JSON result line."""
+    heap = [[i] for i in range(HEAP_OBJECTS)]
+    # Tuned before any frame is sent: mlockall and the freeze take a while
+    if args.child == "tuned":
+        log = DaemonLog(stream=sys.stderr)
+        tune({"realtime_priority": args.priority, "sched_policy": "fifo", "cpu_affinity": args.cpus,
+              "lock_memory": True, "gc_tuning": True}, log)
+        log.close()
+
+    reader, writer = os.pipe()
+    feeder = os.fork()
+    if feeder == 0:
+        # The feeder competes like any process in both runs
+        os.sched_setscheduler(0, os.SCHED_OTHER, os.sched_param(0))
+        os.close(reader)
+        feed(writer, args.seconds, args.rate)
+        os._exit(0)
+    os.close(writer)
+
+    full_before = gc.get_stats()[2]["collections"]
+    latencies = sorted(forward(reader))
+    full = gc.get_stats()[2]["collections"] - full_before
+    os.waitpid(feeder, 0)
+    del heap
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] / 1000
+
+    print(json.dumps({"frames": len(latencies), "p50": pct(0.50), "p99": pct(0.99),
+                      "p999": pct(0.999), "max": latencies[-1] / 1000, "full_gc": full}))
+
+
+def hog():
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    while True:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10.0, help="duration of each run (default: 10)")
+    parser.add_argument("--rate", type=int, default=1000, help="frames per second (default: 1000)")
+    parser.add_argument("--hogs", type=int, default=os.cpu_count() * 2,
+                        help="busy-loop processes (default: 2 per CPU)")
+    parser.add_argument("--priority", type=int, default=50, help="SCHED_FIFO priority when tuned (default: 50)")
+    parser.add_argument("--cpus", type=lambda text: [int(cpu) for cpu in text.split(",")],
+                        help="CPU affinity when tuned, e.g. 0,1 (default: unchanged)")
+    parser.add_argument("--child", choices=("plain", "tuned"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args)
+        return
+
+    hogs = []
+    for _ in range(args.hogs):
+        pid = os.fork()
+        if pid == 0:
+            hog()
+        hogs.append(pid)
+
+    results = {}
+    try:
+        for mode in ("plain", "tuned"):
+            argv = [sys.executable, os.path.abspath(__file__), "--child", mode,
+                    "--seconds", str(args.seconds), "--rate", str(args.rate), "--priority", str(args.priority)]
+            if args.cpus:
+                argv += ["--cpus", ",".join(map(str, args.cpus))]
+            output = subprocess.run(argv, stdout=subprocess.PIPE, text=True, check=True).stdout
+            results[mode] = json.loads(output.splitlines()[-1])
+    finally:
+        for pid in hogs:
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+
+    print(f"{args.hogs} busy processes on {os.cpu_count()} CPU(s), {args.rate} frames/s for {args.seconds:g} s")
+    print(f"{'':<8} {'frames':>8} {'p50 us':>10} {'p99 us':>10} {'p99.9 us':>10} {'max us':>10} {'full GCs':>9}")
+    for mode, r in results.items():
+        print(f"{mode:<8} {r['frames']:>8} {r['p50']:>10.0f} {r['p99']:>10.0f} "
+              f"{r['p999']:>10.0f} {r['max']:>10.0f} {r['full_gc']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Event handling benchmark for the super-activity-view daemon.
+
+Compares the old per-event path (async_read_loop: one Future and one
+awaited handle_event() coroutine per event) with the readiness-driven path
+(one add_reader callback per read, the whole batch run through the
+synchronous SuperTap classifier). Batches come from a real pipe, one byte
+per read, so the event loop's readiness handling is part of the cost.
+
+The stream is mouse motion with a scroll or SUPER tap now and then. Rates
+are events per CPU-second, i.e. per core.
+
+Usage: python3 tools/bench_super_tap.py [--frames N]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from input_codes import EV_SYN, EV_KEY, EV_REL, SYN_REPORT, REL_X, REL_Y, REL_WHEEL
+from super_tap import SuperTap, TAP
+
+KEY_LEFTMETA = 125
+
+# The pipe holds at most this many pending reads
+MAX_FRAMES = 60_000
+
+
+class Event:
+    """Stands in for evdev.InputEvent."""
+
+    __slots__ = ("sec", "usec", "type", "code", "value")
+
+    def __init__(self, etype, code, value):
+        self.sec = 0
+        self.usec = 0
+        self.type = etype
+        self.code = code
+        self.value = value
+
+
+def frame_stream(frames):
+    """One read per frame, like a 1000 Hz mouse: motion, some scrolls and SUPER taps."""
+    batches = []
+    for i in range(frames):
+        if i % 500 == 0:
+            batches.append([Event(EV_KEY, KEY_LEFTMETA, 1), Event(EV_SYN, SYN_REPORT, 0)])
+        elif i % 500 == 1:
+            batches.append([Event(EV_KEY, KEY_LEFTMETA, 0), Event(EV_SYN, SYN_REPORT, 0)])
+        elif i % 97 == 0:
+            batches.append([Event(EV_REL, REL_WHEEL, 1), Event(EV_SYN, SYN_REPORT, 0)])
+        else:
+            batches.append([Event(EV_REL, REL_X, (i % 7) - 3), Event(EV_REL, REL_Y, (i % 5) - 2),
+                            Event(EV_SYN, SYN_REPORT, 0)])
+    return batches
+
+
+class PipeDevice:
+    """A device whose reads come from a pipe: one byte per queued batch."""
+
+    def __init__(self, batches):
+        self.batches = iter(batches)
+        self.fd, writer = os.pipe()
+        os.set_blocking(self.fd, False)
+        os.write(writer, bytes(len(batches)))
+        os.close(writer)
+
+    def read(self):
+        os.read(self.fd, 1)
+        return iter(next(self.batches))
+
+    def close(self):
+        os.close(self.fd)
+
+
+class Counter:
+    def __init__(self):
+        self.taps = 0
+
+    async def trigger(self):
+        self.taps += 1
+
+
+async def run_legacy(device, count, counter):
+    """The old loop: async_read_loop() and an awaited handle_event() per event."""
+    loop = asyncio.get_running_loop()
+    tap = SuperTap({KEY_LEFTMETA})
+
+    class ReadIterator:
+        # Mirrors python-evdev's: a Future per event, add/remove_reader per batch
+        def __init__(self):
+            self.current = iter(())
+
+        def __aiter__(self):
+            return self
+
+        def __anext__(self):
+            future = loop.create_future()
+            try:
+                future.set_result(next(self.current))
+            except StopIteration:
+                def ready():
+                    loop.remove_reader(device.fd)
+                    self.current = device.read()
+                    future.set_result(next(self.current))
+                loop.add_reader(device.fd, ready)
+            return future
+
+    async def handle_event(event):
+        if tap.process(event.type, event.code, event.value, event.sec, event.usec) is TAP:
+            await counter.trigger()
+
+    seen = 0
+    async for event in ReadIterator():
+        await handle_event(event)
+        seen += 1
+        if seen == count:
+            break
+
+
+async def run_batched(device, count, counter):
+    """Readiness callback draining a whole read through the synchronous classifier."""
+    loop = asyncio.get_running_loop()
+    tap = SuperTap({KEY_LEFTMETA})
+    done = loop.create_future()
+    seen = 0
+    tasks = []
+
+    def on_readable():
+        nonlocal seen
+        tapped = False
+        for event in device.read():
+            seen += 1
+            if tap.process(event.type, event.code, event.value, event.sec, event.usec) is TAP:
+                tapped = True
+        if tapped:
+            tasks.append(loop.create_task(counter.trigger()))
+        if seen == count:
+            loop.remove_reader(device.fd)
+            done.set_result(None)
+
+    loop.add_reader(device.fd, on_readable)
+    await done
+    await asyncio.gather(*tasks)
+
+
+def measure(name, runner, batches):
+    count = sum(len(batch) for batch in batches)
+    device = PipeDevice(batches)
+    counter = Counter()
+    start = time.process_time()
+    asyncio.run(runner(device, count, counter))
+    elapsed = time.process_time() - start
+    device.close()
+    rate = count / elapsed
+    print(f"{name:<10} {rate:>14,.0f} events/s per core  {counter.taps} taps")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=50_000,
+                        help=f"number of reads (frames) to process (default: 50000, max: {MAX_FRAMES})")
+    args = parser.parse_args()
+    frames = min(args.frames, MAX_FRAMES)
+
+    batches = frame_stream(frames)
+    print(f"Handling {sum(len(b) for b in batches):,} events in {frames:,} reads")
+    legacy = measure("legacy", run_legacy, batches)
+    batched = measure("batched", run_batched, batches)
+    print(f"speedup    {batched / legacy:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Replay harness for the right-click gesture state machine.
+
+Feeds a synthetic or recorded event stream through RightClickGesture and
+reports the processing cost per event in nanoseconds. No hardware or
+python-evdev is needed, so it can run in CI; --max-ns makes it exit
+non-zero when the hot path regresses past a budget.
+
+Recorded streams are text files with one "type code value" triple per
+line (decimal or 0x-prefixed); blank lines and lines starting with # are
+ignored.
+
+Usage:
+    python3 tools/gesture_replay.py [--frames N] [--snap-every N]
+    python3 tools/gesture_replay.py --stream events.txt
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from input_codes import EV_SYN, EV_KEY, EV_REL, SYN_REPORT, REL_X, REL_Y, BTN_LEFT, BTN_RIGHT
+from rightclick_gesture import RightClickGesture, COMMIT
+
+KEY_LEFTMETA = 125
+
+
+def synthetic_stream(frames, snap_every):
+    """Motion frames with a drag + right-click snap every snap_every frames."""
+    events = []
+    syn = (EV_SYN, SYN_REPORT, 0)
+    # (frame offset within a gesture cycle, button, value)
+    script = {0: (BTN_LEFT, 1), 20: (BTN_RIGHT, 1), 60: (BTN_RIGHT, 0), 80: (BTN_LEFT, 0)}
+    for i in range(frames):
+        button = script.get(i % snap_every) if snap_every else None
+        if button:
+            events.append((EV_KEY, button[0], button[1]))
+        events.append((EV_REL, REL_X, (i % 7) - 3))
+        events.append((EV_REL, REL_Y, (i % 5) - 2))
+        events.append(syn)
+    return events
+
+
+def load_stream(path):
+    events = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            etype, code, value = (int(field, 0) for field in line.split()[:3])
+            events.append((etype, code, value))
+    return events
+
+
+def replay(events, modifier_key=KEY_LEFTMETA):
+    """Run events through a fresh state machine; returns (elapsed_ns, outputs, commits)."""
+    gesture = RightClickGesture(modifier_key)
+    process = gesture.process
+    outputs = 0
+    commits = 0
+    start = time.perf_counter_ns()
+    for etype, code, value in events:
+        out = process(etype, code, value)
+        outputs += len(out)
+        if out is COMMIT:
+            # Replays run in zero time: finish the commit immediately
+            commits += 1
+            outputs += len(gesture.release_modifier())
+    elapsed = time.perf_counter_ns() - start
+    return elapsed, outputs, commits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stream", help="recorded text stream to replay instead of synthetic input")
+    parser.add_argument("--frames", type=int, default=100_000,
+                        help="synthetic motion frames (default: 100000)")
+    parser.add_argument("--snap-every", type=int, default=1000,
+                        help="frames per synthetic drag+snap cycle, 0 for motion only (default: 1000)")
+    parser.add_argument("--rounds", type=int, default=5, help="replays to run, best is reported")
+    parser.add_argument("--max-ns", type=float, help="fail if ns/event exceeds this budget")
+    args = parser.parse_args()
+
+    if args.stream:
+        events = load_stream(args.stream)
+    else:
+        events = synthetic_stream(args.frames, args.snap_every)
+    if not events:
+        print("Empty stream", file=sys.stderr)
+        sys.exit(1)
+
+    keys = [ev for ev in events if ev[0] == EV_KEY]
+    best = min(replay(events)[0] for _ in range(args.rounds))
+    _, outputs, commits = replay(events)
+    per_event = best / len(events)
+
+    print(f"Events:        {len(events):,} ({len(keys):,} key events)")
+    print(f"Output events: {outputs:,}, snap commits: {commits:,}")
+    print(f"All events:    {per_event:.1f} ns/event")
+    if keys:
+        key_best = min(replay(keys)[0] for _ in range(args.rounds))
+        print(f"Key events:    {key_best / len(keys):.1f} ns/event")
+
+    if args.max_ns is not None and per_event > args.max_ns:
+        print(f"FAIL: {per_event:.1f} ns/event exceeds budget of {args.max_ns} ns", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Minimal systemd stand-in for trying the tray indicator on a private bus.
+
+Owns org.freedesktop.systemd1 and exports just what the indicator uses:
+Manager.Subscribe/LoadUnit/StartUnit/StopUnit and the unit's ActiveState
+property, with PropertiesChanged signals sent only while a client is
+subscribed (like systemd). --flip N toggles the unit every N seconds;
+every call and signal is printed, so polling would show up immediately.
+
+Usage:
+    dbus-daemon --session --fork --print-address=1 > /tmp/mock-bus
+    export DBUS_SYSTEM_BUS_ADDRESS=$(cat /tmp/mock-bus)
+    python3 tools/mock_systemd.py --flip 3 &
+    python3 tiling-rightclick-indicator.py
+"""
+
+import argparse
+import os
+import sys
+
+from gi.repository import Gio, GLib
+
+BUS_NAME = "org.freedesktop.systemd1"
+MANAGER_PATH = "/org/freedesktop/systemd1"
+UNIT_INTERFACE = "org.freedesktop.systemd1.Unit"
+
+MANAGER_XML = """
+<node>
+  <interface name="org.freedesktop.systemd1.Manager">
+    <method name="Subscribe"/>
+    <method name="LoadUnit">
+      <arg name="name" type="s" direction="in"/>
+      <arg name="unit" type="o" direction="out"/>
+    </method>
+    <method name="StartUnit">
+      <arg name="name" type="s" direction="in"/>
+      <arg name="mode" type="s" direction="in"/>
+      <arg name="job" type="o" direction="out"/>
+    </method>
+    <method name="StopUnit">
+      <arg name="name" type="s" direction="in"/>
+      <arg name="mode" type="s" direction="in"/>
+      <arg name="job" type="o" direction="out"/>
+    </method>
+  </interface>
+</node>
+"""
+
+UNIT_XML = """
+<node>
+  <interface name="org.freedesktop.systemd1.Unit">
+    <property name="Id" type="s" access="read"/>
+    <property name="ActiveState" type="s" access="read"/>
+  </interface>
+</node>
+"""
+
+
+def unit_path(name):
+    """systemd's object path for a unit: non-alphanumerics become _XX."""
+    escaped = "".join(c if c.isalnum() else f"_{ord(c):02x}" for c in name)
+    return f"{MANAGER_PATH}/unit/{escaped}"
+
+
+class MockSystemd:
+    def __init__(self, connection, unit_name, state):
+        self.connection = connection
+        self.unit_name = unit_name
+        self.state = state
+        self.subscribers = set()
+        self.path = unit_path(unit_name)
+        manager_info = Gio.DBusNodeInfo.new_for_xml(MANAGER_XML).interfaces[0]
+        unit_info = Gio.DBusNodeInfo.new_for_xml(UNIT_XML).interfaces[0]
+        connection.register_object(MANAGER_PATH, manager_info, self.on_manager_call, None, None)
+        connection.register_object(self.path, unit_info, None, self.on_get_property, None)
+
+    def on_manager_call(self, connection, sender, path, interface, method, params, invocation):
+        print(f"{sender}: {method}{params.unpack()}")
+        if method == "Subscribe":
+            self.subscribers.add(sender)
+            invocation.return_value(None)
+        elif method == "LoadUnit":
+            if params.unpack()[0] != self.unit_name:
+                invocation.return_dbus_error("org.freedesktop.systemd1.NoSuchUnit", "Unknown unit")
+                return
+            invocation.return_value(GLib.Variant("(o)", (self.path,)))
+        else:
+            self.set_state("active" if method == "StartUnit" else "inactive")
+            invocation.return_value(GLib.Variant("(o)", (f"{MANAGER_PATH}/job/1",)))
+
+    def on_get_property(self, connection, sender, path, interface, name):
+        print(f"{sender}: Get {name}")
+        if name == "Id":
+            return GLib.Variant("s", self.unit_name)
+        return GLib.Variant("s", self.state)
+
+    def set_state(self, state):
+        self.state = state
+        if not self.subscribers:
+            print(f"ActiveState={state} (no subscribers, no signal)")
+            return
+        print(f"ActiveState={state} -> PropertiesChanged")
+        self.connection.emit_signal(
+            None, self.path, "org.freedesktop.DBus.Properties", "PropertiesChanged",
+            GLib.Variant("(sa{sv}as)", (UNIT_INTERFACE, {"ActiveState": GLib.Variant("s", state)}, [])))
+
+    def flip(self):
+        self.set_state("inactive" if self.state == "active" else "active")
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--unit", default="tiling-rightclick.service", help="unit to serve")
+    parser.add_argument("--state", default="active", help="initial ActiveState (default: active)")
+    parser.add_argument("--flip", type=float, metavar="SECONDS",
+                        help="toggle between active and inactive every SECONDS")
+    args = parser.parse_args()
+
+    if not os.environ.get("DBUS_SYSTEM_BUS_ADDRESS"):
+        print("Set DBUS_SYSTEM_BUS_ADDRESS to a private bus; refusing to impersonate systemd",
+              file=sys.stderr)
+        sys.exit(1)
+
+    connection = Gio.bus_get_sync(Gio.BusType.SYSTEM, None)
+    mock = MockSystemd(connection, args.unit, args.state)
+    Gio.bus_own_name_on_connection(connection, BUS_NAME, Gio.BusNameOwnerFlags.NONE,
+                                   lambda conn, name: print(f"Serving {args.unit} as {name}"),
+                                   lambda conn, name: sys.exit(f"Could not own {name}"))
+    if args.flip:
+        GLib.timeout_add(int(args.flip * 1000), mock.flip)
+    GLib.MainLoop().run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Replay a binary event capture through the daemon logic.
+
+Captures are written by `tiling-rightclick.py --capture FILE` or
+`super_activity_daemon.py --capture FILE`. The file is memory-mapped and
+decoded record by record, so long high-rate captures replay without being
+loaded into Python objects.
+
+Targets:
+    proxy  RightClickGesture + FrameForwarder into a counting sink
+           (no python-evdev needed)
+    super  SuperActivityDaemon.handle_events with injection disabled
+           (needs python-evdev for ecodes, but no devices)
+
+By default records are replayed as fast as possible; --realtime keeps the
+original spacing between kernel timestamps (scaled by --speed).
+
+Usage: python3 tools/replay_capture.py capture.bin [--target proxy|super] [--realtime]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from event_capture import CaptureReader
+from frame_forwarder import FrameForwarder
+from input_codes import EV_KEY, EV_SYN
+from rightclick_gesture import RightClickGesture, COMMIT
+from timer_queue import TimerQueue
+
+KEY_LEFTMETA = 125
+
+
+class CountingSink:
+    """Output device stand-in that only counts what it is given."""
+
+    def __init__(self):
+        self.writes = 0
+
+    def write(self, etype, code, value):
+        self.writes += 1
+
+
+class Pacer:
+    """Sleeps so records come out at their captured spacing."""
+
+    def __init__(self, speed):
+        self.speed = speed
+        self.origin = None
+
+    def wait(self, sec, usec):
+        stamp = sec + usec / 1e6
+        now = time.monotonic()
+        if self.origin is None:
+            self.origin = (stamp, now)
+            return
+        due = self.origin[1] + (stamp - self.origin[0]) / self.speed
+        if due > now:
+            time.sleep(due - now)
+
+
+def replay_proxy(reader, pacer, commit_delay):
+    """Drive the proxy gesture logic; commit timers run on capture time."""
+    stamp = [0.0]
+    timers = TimerQueue(clock=lambda: stamp[0])
+    sink = CountingSink()
+    forwarder = FrameForwarder(sink)
+    gesture = RightClickGesture(KEY_LEFTMETA)
+    commits = 0
+
+    def release_modifier():
+        events = gesture.release_modifier()
+        if events:
+            forwarder.write_frame(events)
+
+    for sec, usec, etype, code, value, device in reader:
+        if pacer:
+            pacer.wait(sec, usec)
+        stamp[0] = sec + usec / 1e6
+        timers.run_due()
+        if etype != EV_KEY:
+            forwarder.push(device, etype, code, value)
+            continue
+        out = gesture.process(etype, code, value)
+        for ev in out:
+            forwarder.push(device, *ev)
+        if out is COMMIT:
+            commits += 1
+            timers.release_later(commit_delay, release_modifier)
+    timers.run_all()
+    return f"{sink.writes:,} events written in {forwarder.frames:,} frames, {commits} snap commits"
+
+
+def replay_super(reader, pacer):
+    """Drive SuperActivityDaemon.handle_events frame by frame without a UInput device."""
+    sys.path.insert(0, os.path.join(ROOT, "super-activity-view"))
+    from evdev import InputEvent
+    from super_activity_daemon import SuperActivityDaemon
+
+    daemon = SuperActivityDaemon(inject=False)
+    taps = 0
+    frame = []
+
+    # The daemon reads whole batches; a captured frame is the closest equivalent
+    for sec, usec, etype, code, value, device in reader:
+        if pacer:
+            pacer.wait(sec, usec)
+        frame.append(InputEvent(sec, usec, etype, code, value))
+        if etype == EV_SYN:
+            taps += daemon.handle_events(frame)
+            frame = []
+    taps += daemon.handle_events(frame)
+    return f"{taps} SUPER taps detected"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("capture", help="capture file to replay")
+    parser.add_argument("--target", choices=("proxy", "super"), default="proxy")
+    parser.add_argument("--realtime", action="store_true", help="keep the captured event timing")
+    parser.add_argument("--speed", type=float, default=1.0, help="realtime playback speed factor")
+    parser.add_argument("--commit-delay-ms", type=float, default=50,
+                        help="proxy snap commit delay (default: 50)")
+    args = parser.parse_args()
+
+    try:
+        reader = CaptureReader(args.capture)
+    except (OSError, ValueError) as err:
+        print(f"Cannot open capture: {err}", file=sys.stderr)
+        sys.exit(1)
+
+    pacer = Pacer(args.speed) if args.realtime else None
+    with reader:
+        print(f"Replaying {len(reader):,} records from {args.capture} into {args.target}")
+        start = time.perf_counter()
+        if args.target == "proxy":
+            summary = replay_proxy(reader, pacer, args.commit_delay_ms / 1000.0)
+        else:
+            summary = replay_super(reader, pacer)
+        elapsed = time.perf_counter() - start
+
+    print(summary)
+    if len(reader):
+        print(f"{elapsed:.3f}s, {len(reader) / elapsed:,.0f} events/s")
+
+
+if __name__ == "__main__":
+    main()
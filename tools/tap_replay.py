@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Replay checks for SUPER tap timing under backlog.
+
+Each scenario is an event stream with two times per event: the kernel
+timestamp and the moment the daemon gets to read it (later when the
+process is busy, a slow injection is running, or the wall clock is set).
+The stream is run through SuperTap timed by kernel timestamps, which is
+what the daemons do, and by read time, which is how taps were timed with
+time.time(). Kernel timing must give the expected result in every
+scenario; the read-time column shows what used to go wrong.
+
+Exits non-zero on any mismatch, so it can run in CI. No python-evdev needed.
+
+Usage: python3 tools/tap_replay.py [-v]
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from input_codes import EV_SYN, EV_KEY, EV_REL, SYN_REPORT, REL_X, REL_WHEEL, KEY_A
+from super_tap import SuperTap, TAP, HELD, INTERRUPTED
+
+KEY_LEFTMETA = 125
+
+
+def press(key):
+    return ((EV_KEY, key, 1), (EV_SYN, SYN_REPORT, 0))
+
+
+def release(key):
+    return ((EV_KEY, key, 0), (EV_SYN, SYN_REPORT, 0))
+
+
+def motion(dx):
+    return ((EV_REL, REL_X, dx), (EV_SYN, SYN_REPORT, 0))
+
+
+# name, expected result, [(kernel time, read time, frame)]; times in seconds
+SCENARIOS = [
+    ("clean tap, read promptly", TAP, [
+        (10.000, 10.001, press(KEY_LEFTMETA)),
+        (10.120, 10.121, release(KEY_LEFTMETA)),
+    ]),
+    ("long hold read in one backlogged batch", HELD, [
+        (10.000, 10.900, press(KEY_LEFTMETA)),
+        (10.800, 10.900, release(KEY_LEFTMETA)),
+    ]),
+    ("quick tap, release stuck behind a stall", TAP, [
+        (10.000, 10.001, press(KEY_LEFTMETA)),
+        (10.150, 10.700, release(KEY_LEFTMETA)),
+    ]),
+    ("quick tap behind a motion burst", TAP, [
+        (10.000, 10.002, press(KEY_LEFTMETA)),
+        *((10.000 + i / 1000, 10.002 + i / 200, motion(1)) for i in range(1, 120)),
+        (10.121, 10.700, release(KEY_LEFTMETA)),
+    ]),
+    ("hold while the wall clock is set back", HELD, [
+        # Read times follow the wall clock, which jumps back an hour mid-hold
+        (10.000, 10.001, press(KEY_LEFTMETA)),
+        (12.000, -3588.0, release(KEY_LEFTMETA)),
+    ]),
+    ("SUPER+scroll in one batch", INTERRUPTED, [
+        (10.000, 10.300, press(KEY_LEFTMETA)),
+        (10.050, 10.300, ((EV_REL, REL_WHEEL, 1), (EV_SYN, SYN_REPORT, 0))),
+        (10.100, 10.300, release(KEY_LEFTMETA)),
+    ]),
+    ("SUPER+key read late", INTERRUPTED, [
+        (10.000, 10.001, press(KEY_LEFTMETA)),
+        (10.050, 10.600, press(KEY_A)),
+        (10.060, 10.600, release(KEY_A)),
+        (10.100, 10.600, release(KEY_LEFTMETA)),
+    ]),
+]
+
+
+def run(stream, use_kernel_time):
+    """Final release result of a stream, timed by kernel or read time."""
+    tap = SuperTap({KEY_LEFTMETA})
+    outcome = None
+    for kernel_time, read_time, frame in stream:
+        stamp = kernel_time if use_kernel_time else read_time
+        sec = int(stamp // 1)
+        usec = round((stamp - sec) * 1e6)
+        for etype, code, value in frame:
+            result = tap.process(etype, code, value, sec, usec)
+            if result in (TAP, HELD, INTERRUPTED):
+                outcome = result
+    return outcome
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-v", "--verbose", action="store_true", help="also list passing scenarios")
+    args = parser.parse_args()
+
+    failures = 0
+    print(f"{'scenario':<42} {'expected':<12} {'kernel':<12} {'read time':<12}")
+    for name, expected, stream in SCENARIOS:
+        kernel = run(stream, True)
+        legacy = run(stream, False)
+        ok = kernel == expected
+        failures += not ok
+        if args.verbose or not ok or legacy != expected:
+            mark = "" if ok else "  FAIL"
+            print(f"{name:<42} {expected:<12} {kernel or '-':<12} {legacy or '-':<12}{mark}")
+
+    print(f"{len(SCENARIOS) - failures}/{len(SCENARIOS)} scenarios pass with kernel timestamps")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()